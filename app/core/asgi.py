@@ -0,0 +1,219 @@
+"""ASGI serving of the Django project
+
+Django 2.2 has neither an ASGI handler nor async views. AsgiHandler runs
+the usual middleware and views, synchronously, but keeps the network I/O
+in the event loop: the request body is read before a thread is taken and
+the response is sent after the view gave it back. A slow client then only
+holds a coroutine, where a WSGI server holds a worker thread for the whole
+exchange. Bodies are capped at ASGI_MAX_BODY_SIZE bytes while they are
+received, as Django's own limits only apply to a body already read.
+
+Every request gets a thread-sensitive context of its own, see
+asgiref.sync: the view and the iteration of a streaming response run on
+one thread, so Django's per-thread database connections and transactions
+behave as under WSGI. Views can read independent data concurrently with
+core.fanout.gather().
+
+Views themselves stay synchronous, post list and retrieve and tag list
+included: Django 2.2 cannot run async views, and its middleware, which
+authenticates and instruments requests, is synchronous. Concurrency
+within a request comes from core.fanout instead. The post list and
+retrieve read their relations concurrently, the feed its page and tag
+counts. The tag list is a single query, with nothing to read alongside.
+"""
+import json
+import sys
+import tempfile
+
+import django
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def build_environ(scope, body):
+    """Return the WSGI environ of an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI strings are bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = (
+            scope['client'][0], str(scope['client'][1])
+        )
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            # Cookie pairs are separated by semicolons, RFC 6265
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    if 'CONTENT_LENGTH' not in environ:
+        # Chunked bodies have no length, Django only reads CONTENT_LENGTH
+        body.seek(0, 2)
+        environ['CONTENT_LENGTH'] = str(body.tell())
+        body.seek(0)
+    return environ
+
+
+class RequestBodyTooLarge(Exception):
+    """The request body is larger than ASGI_MAX_BODY_SIZE"""
+
+
+class AsgiHandler:
+    """ASGI application running the Django middleware and views"""
+
+    def __init__(self):
+        self.wsgi = WSGIHandler()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]}')
+
+        try:
+            body = await self.read_body(scope, receive)
+        except RequestBodyTooLarge:
+            await self.send_too_large(send)
+            return
+        if body is None:
+            return
+        try:
+            async with ThreadSensitiveContext():
+                await self.handle(build_environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive):
+        """Return the request body as a file, or None on disconnect
+
+        Raise RequestBodyTooLarge once the declared or received length is
+        over ASGI_MAX_BODY_SIZE.
+        """
+        limit = settings.ASGI_MAX_BODY_SIZE
+        for name, value in scope.get('headers', []):
+            if (name.lower() == b'content-length' and value.isdigit() and
+                    int(value) > limit):
+                raise RequestBodyTooLarge
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > limit:
+                # Chunked bodies have no declared length to refuse early
+                body.close()
+                raise RequestBodyTooLarge
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    async def send_too_large(self, send):
+        limit = settings.ASGI_MAX_BODY_SIZE
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json')],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps({
+                'detail': f'Request bodies must be at most {limit} bytes'
+            }).encode(),
+        })
+
+    def get_response(self, environ):
+        """Return the status, headers and body of the response to environ
+
+        The body is bytes, or the response itself when it streams.
+        """
+        started = []
+        response = self.wsgi(
+            environ,
+            lambda status, headers, exc_info=None: started.append(
+                (status, headers)
+            )
+        )
+        status, headers = started[-1]
+        if getattr(response, 'streaming', False):
+            return status, headers, response
+        try:
+            content = b''.join(response)
+        finally:
+            # Sends request_finished, closing the database connections
+            response.close()
+        return status, headers, content
+
+    async def handle(self, environ, send):
+        status, headers, body = await sync_to_async(self.get_response)(
+            environ
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ],
+        })
+        if isinstance(body, bytes):
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        chunks = iter(body)
+        try:
+            while True:
+                # Streaming responses may query, on the request's thread
+                chunk = await sync_to_async(next)(chunks, None)
+                if chunk is None:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await sync_to_async(body.close)()
+
+
+def get_asgi_application():
+    """Set up Django and return its ASGI application"""
+    django.setup(set_prefix=False)
+    return AsgiHandler()
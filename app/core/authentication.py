@@ -0,0 +1,188 @@
+"""Token authentication backed by an in-process lookup cache
+
+Each worker process keeps recently seen tokens and their users, keyed by
+a digest of the token key, so repeat requests skip the Token JOIN User
+query. Entries of a process are dropped as soon as that process sees the
+token deleted or the user saved, which covers deactivation and password
+changes.
+
+Other processes learn of it through a per-user generation number in the
+TOKEN_AUTH_CACHE['CACHE_ALIAS'] cache, bumped once the change commits.
+Entries remember the generation they were cached at and are only used
+while it is still current, which costs a cache lookup but no query. If
+that cache is not shared, TOKEN_AUTH_CACHE['TIMEOUT'] bounds how long a
+revoked token can live on in other processes.
+"""
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Thread-safe LRU mapping of token digests to (user, token) pairs
+
+    Each pair is cached with the generation of its user, see
+    get_user_generation().
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._user_digests = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def digest(key):
+        """Return the cache key of a token, so raw tokens are never kept"""
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached (user, token, generation) of a key, or None"""
+        digest = self.digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(digest)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1], entry[2], entry[3]
+
+    def set(self, key, user, token, generation=None):
+        """Cache the user, token and user generation of a token key"""
+        digest = self.digest(key)
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._remove(digest)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._entries[digest] = (expires, user, token, generation)
+            self._user_digests.setdefault(user.pk, set()).add(digest)
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            digests = self._user_digests.get(entry[1].pk, set())
+            digests.discard(digest)
+            if not digests:
+                self._user_digests.pop(entry[1].pk, None)
+
+    def invalidate_key(self, key):
+        """Drop the entry of a token key"""
+        with self._lock:
+            self._remove(self.digest(key))
+
+    def invalidate_user(self, user_id):
+        """Drop every entry of a user"""
+        with self._lock:
+            for digest in list(self._user_digests.get(user_id, ())):
+                self._remove(digest)
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._user_digests.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_AUTH_CACHE['MAX_ENTRIES'],
+    timeout=settings.TOKEN_AUTH_CACHE['TIMEOUT'],
+)
+
+
+def _generation_key(user_id):
+    return f'token-auth:generation:{user_id}'
+
+
+def get_user_generation(user_id):
+    """Return the number of token revocations of a user, shared by processes
+
+    An evicted count reads as None, which no cached entry expects after a
+    revocation, so it can only cost a lookup.
+    """
+    cache = caches[settings.TOKEN_AUTH_CACHE['CACHE_ALIAS']]
+    return cache.get(_generation_key(user_id))
+
+
+def _bump_user_generation(user_id):
+    cache = caches[settings.TOKEN_AUTH_CACHE['CACHE_ALIAS']]
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        cache.set(_generation_key(user_id), 1, timeout=None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that remembers recently used tokens
+
+    Whether the token was found in the cache is left on the Django request
+    as token_cache_hit, which core.instrumentation records per endpoint.
+    """
+    cache = token_cache
+    cache_hit = None
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if self.cache_hit is not None:
+            request._request.token_cache_hit = self.cache_hit
+        return result
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            user, token, generation = cached
+            if generation != get_user_generation(user.pk):
+                # Revoked by another process
+                self.cache.invalidate_key(key)
+                cached = None
+        self.cache_hit = cached is not None
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            self.cache.set(key, user, token, get_user_generation(user.pk))
+
+        # Each request gets its own copy, as views may modify request.user
+        return copy.copy(user), token
+
+
+def _expire_token(sender, instance, **kwargs):
+    token_cache.invalidate_key(instance.key)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: _bump_user_generation(user_id))
+
+
+def _expire_user(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    user_id = instance.pk
+    transaction.on_commit(lambda: _bump_user_generation(user_id))
+
+
+post_delete.connect(_expire_token, sender=Token)
+post_save.connect(_expire_token, sender=Token)
+post_save.connect(_expire_user, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(_expire_user, sender=settings.AUTH_USER_MODEL)
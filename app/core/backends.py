@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import (
+    check_password, get_hasher, identify_hasher, make_password
+)
+
+from core.hashers import hashing_pool
+
+
+class PooledModelBackend(ModelBackend):
+    """Model backend that verifies passwords in the hashing pool
+
+    Only the hash runs in the pool; database access stays on the request
+    thread. When the pool is disabled this is the stock ModelBackend.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if not settings.PASSWORD_HASHING_POOL['ENABLED']:
+            return super().authenticate(
+                request, username=username, password=password, **kwargs
+            )
+
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so a missing user takes as long as a wrong
+            # password (see ModelBackend.authenticate)
+            hashing_pool.run(make_password, password)
+            return None
+
+        if not hashing_pool.run(check_password, password, user.password):
+            return None
+        if self._must_rehash(user.password):
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
+        return None
+
+    def _must_rehash(self, encoded):
+        """Return True if the password hash predates the current policy"""
+        preferred = get_hasher('default')
+        hasher = identify_hasher(encoded)
+        return (
+            hasher.algorithm != preferred.algorithm or
+            preferred.must_update(encoded)
+        )
@@ -0,0 +1,481 @@
+"""API benchmark suite
+
+seed() fills the database with a reproducible data set of a given size,
+and run_scenarios() drives API endpoints through the project's WSGI
+application in-process. Results record latency percentiles, throughput
+and query counts per scenario, and are stored as JSON by the benchmark_api
+command so runs can be compared between commits.
+
+run_slow_clients() compares the WSGI and ASGI applications, see
+core.asgi, under many concurrent clients that are slow to send their
+requests and read the responses, for the benchmark_slow_clients command.
+"""
+import asyncio
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connections, transaction
+from rest_framework.authtoken.models import Token
+
+from core import search
+from core.asgi import AsgiHandler
+from core.instrumentation import QueryLog
+from core.models import (
+    Ingredient, Post, PostIngredient, PostRate, PostTag, Tag
+)
+
+
+PASSWORD = 'benchmark-password'
+BATCH_SIZE = 5000
+
+WORDS = (
+    'chicken', 'pasta', 'curry', 'salad', 'soup', 'tofu', 'lentil', 'rice',
+    'noodle', 'bread', 'cake', 'pie', 'spicy', 'lemon', 'garlic', 'tomato',
+    'basil', 'mushroom', 'beef', 'salmon', 'chocolate', 'vanilla', 'quick',
+    'roasted', 'grilled', 'creamy', 'crispy', 'vegan', 'summer', 'winter',
+)
+CATEGORIES = ('starter', 'main', 'dessert', 'drink', 'snack')
+
+# Full scale data set, multiplied by the scale passed to seed()
+VOLUMES = {
+    'users': 10000,
+    'posts': 100000,
+    'rates': 1000000,
+}
+TAGS_PER_USER = 5
+INGREDIENTS_PER_USER = 10
+
+
+def _bulk_create(model, objects, batch_size=BATCH_SIZE):
+    """Insert objects from an iterable without holding them all at once"""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def seed(scale=1.0, seed=0):
+    """Fill the database with users, posts, tags and rates
+
+    Return the number of rows created per model. Counters and the search
+    index, which bulk inserts bypass, are rebuilt at the end.
+    """
+    rng = random.Random(seed)
+    volumes = {
+        name: max(int(count * scale), 1) for name, count in VOLUMES.items()
+    }
+    User = get_user_model()
+    # Hashing once keeps seeding fast, logins still verify in full
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        _bulk_create(User, (
+            User(email=f'bench{i}@example.com', password=password)
+            for i in range(volumes['users'])
+        ))
+        user_ids = list(User.objects.filter(
+            email__startswith='bench'
+        ).values_list('id', flat=True))
+        _bulk_create(Token, (
+            Token(key=f'{rng.getrandbits(160):040x}', user_id=user_id)
+            for user_id in user_ids
+        ))
+
+        for model, count in ((Tag, TAGS_PER_USER),
+                             (Ingredient, INGREDIENTS_PER_USER)):
+            _bulk_create(model, (
+                model(user_id=user_id, name=name)
+                for user_id in user_ids
+                for name in rng.sample(WORDS, count)
+            ))
+        tags = _ids_by_user(Tag)
+        ingredients = _ids_by_user(Ingredient)
+
+        _bulk_create(Post, (
+            Post(
+                user_id=rng.choice(user_ids),
+                title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                content=' '.join(rng.choices(WORDS, k=12)),
+                category=rng.choice(CATEGORIES),
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+            )
+            for _ in range(volumes['posts'])
+        ))
+        posts = list(Post.objects.values_list('id', 'user_id'))
+        _bulk_create(PostTag, (
+            PostTag(post_id=post_id, tag_id=tag_id)
+            for post_id, user_id in posts
+            for tag_id in rng.sample(tags[user_id], 2)
+        ))
+        _bulk_create(PostIngredient, (
+            PostIngredient(post_id=post_id, ingredient_id=ingredient_id)
+            for post_id, user_id in posts
+            for ingredient_id in rng.sample(ingredients[user_id], 4)
+        ))
+        _bulk_create(PostRate, (
+            PostRate(
+                post_id=rng.choice(posts)[0],
+                user_id=rng.choice(user_ids),
+                rate=rng.randint(1, 5),
+            )
+            for _ in range(volumes['rates'])
+        ))
+
+    call_command('rebuild_post_counters', stdout=io.StringIO())
+    search.rebuild_index()
+
+    return volumes
+
+
+def _ids_by_user(model):
+    ids = {}
+    for user_id, pk in model.objects.values_list('user_id', 'id'):
+        ids.setdefault(user_id, []).append(pk)
+    return ids
+
+
+def _host():
+    hosts = [h for h in settings.ALLOWED_HOSTS if '*' not in h]
+    return hosts[0].lstrip('.') if hosts else 'localhost'
+
+
+class WSGIClient:
+    """Send requests straight to a WSGI application, in this process"""
+
+    def __init__(self, application=None):
+        self.application = application or get_wsgi_application()
+        self.host = _host()
+
+    def request(self, method, path, body=None, token=None):
+        """Send a request and return its status code, reading the body"""
+        path, _, query = path.partition('?')
+        payload = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(payload),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if token is not None:
+            environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+
+        status = []
+        result = self.application(
+            environ, lambda line, headers, exc_info=None: status.append(line)
+        )
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(status[0].split()[0])
+
+
+class Fixtures:
+    """Users, tokens and posts of the seeded data set to pick from"""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        User = get_user_model()
+        self.tokens = dict(Token.objects.values_list('user_id', 'key'))
+        self.emails = dict(User.objects.filter(
+            pk__in=self.tokens
+        ).values_list('id', 'email'))
+        self.user_ids = sorted(self.tokens)
+        self.posts = list(Post.objects.filter(
+            user_id__in=self.tokens
+        ).values_list('id', 'user_id'))
+
+    def user(self):
+        """Return the id and token of a random user"""
+        user_id = self.rng.choice(self.user_ids)
+        return user_id, self.tokens[user_id]
+
+    def post(self):
+        """Return a random post id and its owner's token"""
+        post_id, user_id = self.rng.choice(self.posts)
+        return post_id, self.tokens[user_id]
+
+
+def _post_list(fixtures):
+    return 'GET', '/api/post/create/', None, fixtures.user()[1]
+
+
+def _post_page(fixtures):
+    return 'GET', '/api/post/create/?page_size=20', None, fixtures.user()[1]
+
+
+def _post_retrieve(fixtures):
+    post_id, token = fixtures.post()
+    return 'GET', f'/api/post/create/{post_id}/', None, token
+
+
+def _post_search(fixtures):
+    query = fixtures.rng.choice(WORDS)
+    return 'GET', f'/api/post/create/?q={query}', None, fixtures.user()[1]
+
+
+def _post_create(fixtures):
+    body = {
+        'title': ' '.join(fixtures.rng.sample(WORDS, 3)),
+        'time_minutes': fixtures.rng.randint(5, 180),
+        'price': '9.99',
+        'tags': [],
+        'ingredients': [],
+    }
+    return 'POST', '/api/post/create/', body, fixtures.user()[1]
+
+
+def _post_feed(fixtures):
+    return 'GET', '/api/post/create/feed/', None, fixtures.user()[1]
+
+
+def _tag_list(fixtures):
+    return 'GET', '/api/post/tags/', None, fixtures.user()[1]
+
+
+def _token(fixtures):
+    user_id, _ = fixtures.user()
+    body = {'email': fixtures.emails[user_id], 'password': PASSWORD}
+    return 'POST', '/api/user/token/', body, None
+
+
+SCENARIOS = {
+    'post-list': _post_list,
+    'post-page': _post_page,
+    'post-retrieve': _post_retrieve,
+    'post-search': _post_search,
+    'post-create': _post_create,
+    'post-feed': _post_feed,
+    'tag-list': _tag_list,
+    'token': _token,
+}
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values"""
+    if not values:
+        return 0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def _latency_ms(latencies):
+    """Return the mean, percentiles and maximum of latencies in ms"""
+    latencies = sorted(latencies)
+    return {
+        'mean': sum(latencies) / len(latencies) * 1000,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': latencies[-1] * 1000,
+    }
+
+
+def run_scenario(client, fixtures, scenario, requests, warmup=0):
+    """Send requests for a scenario and return its measurements"""
+    make_request = SCENARIOS[scenario]
+    for _ in range(warmup):
+        client.request(*make_request(fixtures))
+
+    latencies = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, path, body, token = make_request(fixtures)
+        log = QueryLog(keep_sql=False)
+        with connections['default'].execute_wrapper(log):
+            start = time.perf_counter()
+            status = client.request(method, path, body, token)
+            latencies.append(time.perf_counter() - start)
+        queries.append(log.count)
+        if status >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput': requests / elapsed if elapsed else 0,
+        'latency_ms': _latency_ms(latencies),
+        'queries': {
+            'mean': sum(queries) / len(queries),
+            'max': max(queries),
+        },
+    }
+
+
+def run_scenarios(scenarios=None, requests=200, warmup=10, seed=0):
+    """Run scenarios against the seeded data and return their results"""
+    client = WSGIClient()
+    fixtures = Fixtures(seed)
+    return {
+        scenario: run_scenario(client, fixtures, scenario, requests, warmup)
+        for scenario in scenarios or SCENARIOS
+    }
+
+
+# Scenarios without writes, which slow clients can repeat at any scale
+READ_SCENARIOS = ('post-list', 'post-page', 'post-retrieve', 'post-feed',
+                  'tag-list')
+SERVERS = ('wsgi', 'asgi')
+
+
+def _wsgi_slow_clients(calls, clients, threads, delay):
+    """Return (status, latency) of calls sent through WSGI worker threads
+
+    Like the threads of a gthread worker, each of threads is busy from the
+    first byte of the request to the last byte of the response.
+    """
+    client = WSGIClient()
+    calls = iter(calls)
+    lock = threading.Lock()
+
+    def exchange(call):
+        time.sleep(delay)
+        status = client.request(*call)
+        time.sleep(delay)
+        return status
+
+    def run_client(workers):
+        results = []
+        while True:
+            with lock:
+                call = next(calls, None)
+            if call is None:
+                return results
+            start = time.perf_counter()
+            status = workers.submit(exchange, call).result()
+            results.append((status, time.perf_counter() - start))
+
+    with ThreadPoolExecutor(threads) as workers, \
+            ThreadPoolExecutor(clients) as pool:
+        futures = [pool.submit(run_client, workers) for _ in range(clients)]
+        return [result for future in futures for result in future.result()]
+
+
+async def _asgi_request(handler, host, call, delay):
+    method, path, body, token = call
+    path, _, query = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    headers = [
+        (b'host', host.encode()),
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(payload)).encode()),
+    ]
+    if token is not None:
+        headers.append((b'authorization', f'Token {token}'.encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 0),
+        'server': (host, 80),
+    }
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {'type': 'http.disconnect'}
+        received = True
+        await asyncio.sleep(delay)
+        return {'type': 'http.request', 'body': payload}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif not message.get('more_body'):
+            await asyncio.sleep(delay)
+
+    await handler(scope, receive, send)
+    return status[0]
+
+
+def _asgi_slow_clients(calls, clients, delay):
+    """Return (status, latency) of calls sent through core.asgi"""
+    handler = AsgiHandler()
+    host = _host()
+    calls = iter(calls)
+
+    async def run_client():
+        results = []
+        for call in calls:
+            start = time.perf_counter()
+            status = await _asgi_request(handler, host, call, delay)
+            results.append((status, time.perf_counter() - start))
+        return results
+
+    async def run_clients():
+        return await asyncio.gather(*(run_client() for _ in range(clients)))
+
+    return [
+        result
+        for results in asyncio.run(run_clients())
+        for result in results
+    ]
+
+
+def run_slow_clients(server, scenario, requests, clients=64, threads=8,
+                     delay=0.05, seed=0):
+    """Send requests for a read scenario from slow clients
+
+    clients concurrent clients each take delay seconds to send a request
+    and as long to read its response. server is 'wsgi', handled by threads
+    threads, or 'asgi'. Return the throughput and latency measurements.
+    """
+    make_request = SCENARIOS[scenario]
+    fixtures = Fixtures(seed)
+    calls = [make_request(fixtures) for _ in range(requests)]
+
+    started = time.perf_counter()
+    if server == 'wsgi':
+        results = _wsgi_slow_clients(calls, clients, threads, delay)
+    else:
+        results = _asgi_slow_clients(calls, clients, delay)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': sum(1 for status, _ in results if status >= 400),
+        'throughput': requests / elapsed if elapsed else 0,
+        'latency_ms': _latency_ms([latency for _, latency in results]),
+    }
@@ -0,0 +1,162 @@
+"""Per-user response caching for read-only API endpoints
+
+Cached responses are keyed by a per-user version number. Any write that
+can change what a user sees bumps that user's version, so entries cached
+before the write are never read again and simply age out of the cache.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+
+_sizes = {}
+
+
+class SizeBoundedLRUCache(LocMemCache):
+    """Local memory cache that evicts least recently used entries by size
+
+    MAX_SIZE in OPTIONS caps the total pickled size of the stored values in
+    bytes; MAX_ENTRIES still caps their number as for LocMemCache.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._size = _sizes.setdefault(name, {'total': 0, 'entries': {}})
+
+    def _set(self, key, value, timeout=None):
+        self._delete(key)
+        while self._cache and (
+            self._size['total'] + len(value) > self._max_size
+        ):
+            self._evict_oldest()
+        super()._set(key, value, timeout)
+        self._size['entries'][key] = len(value)
+        self._size['total'] += len(value)
+
+    def _evict_oldest(self):
+        """Drop the least recently used entry"""
+        key = next(reversed(self._cache))
+        self._delete(key)
+
+    def _cull(self):
+        super()._cull()
+        entries = self._size['entries']
+        for key in set(entries) - set(self._cache):
+            self._size['total'] -= entries.pop(key)
+
+    def _delete(self, key):
+        super()._delete(key)
+        self._size['total'] -= self._size['entries'].pop(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_info.clear()
+            self._size['entries'].clear()
+            self._size['total'] = 0
+
+
+def get_response_cache():
+    """Return the cache that stores API responses"""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'response-version:{user_id}'
+
+
+def _initial_version():
+    """Return a starting version that no earlier version can match
+
+    Version keys can be evicted like any other entry, so restarting from a
+    fixed number could make old responses current again.
+    """
+    return time.time_ns()
+
+
+def get_user_version(user_id):
+    """Return the current response cache version of a user"""
+    cache = get_response_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _initial_version()
+        if not cache.add(_version_key(user_id), version, timeout=None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def _bump_user_version(user_id):
+    cache = get_response_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _initial_version(), timeout=None)
+
+
+def expire_user_responses(user_id):
+    """Invalidate every cached response of a user once the write commits
+
+    Bumping the version before the commit would let a concurrent read
+    cache the uncommitted state under the new version.
+    """
+    transaction.on_commit(lambda: _bump_user_version(user_id))
+
+
+def response_cache_key(request, view_name):
+    """Return the cache key of a response for the requesting user
+
+    The user's creation date is part of the key so that a reused user id,
+    e.g. after the database was reset, can never see a previous owner's
+    entries.
+    """
+    user = request.user
+    created = user.creationDate.timestamp() if user.creationDate else ''
+    path = hashlib.md5(
+        request.get_full_path().encode('utf-8')
+    ).hexdigest()
+    version = get_user_version(user.pk)
+
+    return f'response:{user.pk}:{created}:{version}:{view_name}:{path}'
+
+
+class CachedResponseMixin:
+    """Base for viewset mixins that serve responses from the cache"""
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Return the cached data of handler, computing it on a miss"""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return handler(request, *args, **kwargs)
+
+        cache = get_response_cache()
+        key = response_cache_key(request, type(self).__name__)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Serve list responses from the per-user response cache"""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Serve retrieve responses from the per-user response cache"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,105 @@
+"""Conditional GET support for read-only API endpoints
+
+Validators come from one aggregate query over the rows a response would
+show, so a client holding a current copy gets its 304 before anything is
+serialized. The ETag also covers the user's response cache version, see
+core.cache, which every write to the user's rows bumps. That version
+catches the related rows the aggregate does not see, like renamed tags.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.cache import get_user_version
+
+
+class ConditionalGetMixin:
+    """Base for viewset mixins that answer conditional GET requests
+
+    `last_modified_field` is aggregated with MAX and the row count goes
+    into the ETag. `validator_aggregates` may add more aggregates, for
+    counters that change without touching `last_modified_field`.
+
+    Last-Modified is only sent with `send_last_modified`, for responses
+    whose every change moves `last_modified_field`.
+    """
+    last_modified_field = 'updatedDate'
+    validator_aggregates = {}
+    send_last_modified = True
+
+    def get_validator_queryset(self):
+        """Return the rows whose state the response depends on"""
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self):
+        """Return the ETag and last modified time of the response"""
+        queryset = self.get_validator_queryset()
+        if queryset.query.can_filter():
+            # Ordering is irrelevant to the aggregate, unless a slice
+            # decides which rows are in the response
+            queryset = queryset.order_by()
+        state = queryset.aggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk'),
+            **self.validator_aggregates
+        )
+        last_modified = state['last_modified']
+        fingerprint = '|'.join([
+            type(self).__name__,
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            str(get_user_version(self.request.user.pk)),
+            last_modified.isoformat() if last_modified else '',
+        ] + [str(state[name]) for name in sorted(state)])
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+        if not self.send_last_modified:
+            last_modified = None
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Return 304 when the client copy is current, else call handler"""
+        etag, last_modified = self.get_validators()
+        # HTTP dates have whole seconds, so compare at that resolution
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """Answer conditional list requests"""
+    # Deleting a row never moves MAX(updatedDate), only the ETag notices
+    send_last_modified = False
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Answer conditional retrieve requests"""
+
+    def get_validator_queryset(self):
+        if self.action != 'retrieve':
+            return super().get_validator_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(**{
+            self.lookup_field: self.kwargs[lookup_url_kwarg]
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,10 @@
+from django.db.backends.mysql import base
+
+from core.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """MySQL backend taking its connections from a pool, see core.pool"""
+
+    def check_pooled_connection(self, connection):
+        connection.ping()
@@ -0,0 +1,11 @@
+from django.db.backends.sqlite3 import base
+
+from core.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite backend taking its connections from a pool, see core.pool
+
+    Stands in for the MySQL one in tests and local runs. In-memory
+    databases are never closed, so they never go back to the pool.
+    """
@@ -0,0 +1,143 @@
+"""Concurrent independent reads within a request
+
+gather() runs functions that don't depend on each other, like the page of
+posts and the tag counts of a feed, concurrently on a pool of
+FANOUT['WORKERS'] threads and returns their results. The request then
+waits for the slowest read rather than for their sum.
+
+Each function runs on a database connection of its own, closed when it
+returns; the pooled backends in core.db make that cheap. They read from
+the caller's replica, see core.routers, and run the caller's database
+execute wrappers, so core.instrumentation counts their queries. Inside a
+transaction, where reads must see its uncommitted writes, the functions
+run one after the other on the caller's connection instead. So do those
+of a gather() called from a function it runs, which could otherwise wait
+for a worker that waits for it. Only use gather() to read.
+
+ConcurrentPrefetchQuerySet runs the prefetch_related() lookups of a
+queryset this way, so the tags, ingredients and images of posts are read
+at the same time rather than one after the other.
+"""
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Prefetch, QuerySet, prefetch_related_objects
+
+from core.routers import current_replica, use_replica
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Set on the threads running a function of gather()
+_worker = threading.local()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.FANOUT['WORKERS'],
+                thread_name_prefix='fanout'
+            )
+        return _executor
+
+
+def _run(function, replica, wrappers):
+    use_replica(replica)
+    _worker.active = True
+    try:
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(wrapper)
+                    )
+            return function()
+    finally:
+        _worker.active = False
+        use_replica(None)
+        connections.close_all()
+
+
+def gather(*functions):
+    """Call functions concurrently and return their results in order
+
+    An exception raised by one of them is raised once all have returned.
+    """
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block or \
+            getattr(_worker, 'active', False):
+        return [function() for function in functions]
+    # Database state is per thread, hand the caller's to the workers
+    replica = current_replica()
+    wrappers = {
+        alias: list(connections[alias].execute_wrappers)
+        for alias in connections
+    }
+    executor = _get_executor()
+    futures = [
+        executor.submit(_run, function, replica, wrappers)
+        for function in functions
+    ]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
+
+
+def _prefetch_root(lookup):
+    if isinstance(lookup, Prefetch):
+        lookup = lookup.prefetch_to
+    return lookup.split('__', 1)[0]
+
+
+def prefetch_concurrently(instances, *lookups):
+    """Like prefetch_related_objects(), with the relations read concurrently
+
+    Lookups of the same relation, like 'tags' and 'tags__user', are read
+    together. Each relation is prefetched onto copies of the instances,
+    whose caches are then handed to the instances, so no two threads touch
+    the same cache.
+    """
+    groups = {}
+    for lookup in lookups:
+        groups.setdefault(_prefetch_root(lookup), []).append(lookup)
+    if len(groups) < 2 or not instances:
+        prefetch_related_objects(instances, *lookups)
+        return
+
+    def prefetch(group):
+        copies = []
+        for instance in instances:
+            instance_copy = copy.copy(instance)
+            instance_copy._prefetched_objects_cache = {}
+            copies.append(instance_copy)
+        prefetch_related_objects(copies, *group)
+        return copies
+
+    results = gather(*(
+        lambda group=group: prefetch(group) for group in groups.values()
+    ))
+    for copies in results:
+        for instance, instance_copy in zip(instances, copies):
+            for name, value in instance_copy.__dict__.items():
+                if name == '_prefetched_objects_cache':
+                    instance.__dict__.setdefault(name, {}).update(value)
+                elif name not in instance.__dict__:
+                    # Prefetch(to_attr=...) results
+                    instance.__dict__[name] = value
+
+
+class ConcurrentPrefetchQuerySet(QuerySet):
+    """QuerySet reading its prefetch_related() lookups concurrently"""
+
+    def _prefetch_related_objects(self):
+        prefetch_concurrently(
+            self._result_cache, *self._prefetch_related_lookups
+        )
+        self._prefetch_done = True
@@ -0,0 +1,154 @@
+"""Password hashing policy
+
+ScryptPasswordHasher is the preferred hasher in settings.PASSWORD_HASHERS.
+Its costs come from settings.SCRYPT_HASHER. Django rehashes a password
+with the preferred hasher on the next successful login whenever it was
+stored with another hasher or with different costs.
+
+With settings.PASSWORD_HASHING_POOL['ENABLED'], login verification runs in
+a small worker pool instead of on the request thread, see HashingPool.
+"""
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import BasePasswordHasher, mask_hash
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+
+class ScryptPasswordHasher(BasePasswordHasher):
+    """Secure password hashing using the scrypt algorithm
+
+    Uses the same encoding as the scrypt hasher of later Django releases,
+    so stored hashes keep working after an upgrade.
+    """
+    algorithm = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_HASHER['N']
+
+    @property
+    def block_size(self):
+        return settings.SCRYPT_HASHER['R']
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_HASHER['P']
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r,
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def decode(self, encoded):
+        algorithm, n, salt, r, p, hash_ = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(n),
+            'salt': salt,
+            'block_size': int(r),
+            'parallelism': int(p),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password,
+            decoded['salt'],
+            decoded['work_factor'],
+            decoded['block_size'],
+            decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return OrderedDict([
+            (_('algorithm'), decoded['algorithm']),
+            (_('work factor'), decoded['work_factor']),
+            (_('block size'), decoded['block_size']),
+            (_('parallelism'), decoded['parallelism']),
+            (_('salt'), mask_hash(decoded['salt'])),
+            (_('hash'), mask_hash(decoded['hash'])),
+        ])
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded['work_factor'] != self.work_factor or
+            decoded['block_size'] != self.block_size or
+            decoded['parallelism'] != self.parallelism
+        )
+
+    def harden_runtime(self, password, encoded):
+        # The runtime for scrypt is too complicated to emulate
+        pass
+
+
+class HashingPoolBusy(Exception):
+    """Raised when every hashing worker is busy and the queue is full"""
+
+
+class HashingPool:
+    """Bounded thread pool for CPU heavy password hashing
+
+    hashlib releases the GIL while hashing, so at most `workers` hashes run
+    at once and at most `queue_size` more wait for a worker. Anything beyond
+    that is refused straight away instead of piling up behind the burst.
+    """
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='password-hashing'
+                )
+            return self._executor
+
+    def run(self, func, *args, **kwargs):
+        """Run func in the pool and return its result"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy()
+        try:
+            future = self._get_executor().submit(func, *args, **kwargs)
+            return future.result()
+        finally:
+            self._slots.release()
+
+
+def _default_workers():
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASHING_POOL.get('WORKERS') or _default_workers(),
+    queue_size=settings.PASSWORD_HASHING_POOL['QUEUE_SIZE'],
+)
@@ -0,0 +1,67 @@
+"""Health endpoints for load balancers and container orchestrators
+
+Both are plain Django views: no authentication, throttling or
+serialization runs for them, as probes hit them every few seconds.
+
+- /healthz answers as long as the process serves requests (liveness).
+- /readyz also checks the database answers and image storage is writable
+  (readiness), and answers 503 naming what failed otherwise. Why it
+  failed is only logged, probes may be reachable from outside.
+"""
+import logging
+import os
+
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from core.storage import image_storage
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_database():
+    """Raise unless the default database answers a query"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_storage():
+    """Raise unless the image storage directory exists and is writable"""
+    location = image_storage.location
+    if not os.path.isdir(location):
+        raise OSError(f'{location} is not a directory')
+    if not os.access(location, os.W_OK):
+        raise OSError(f'{location} is not writable')
+
+
+CHECKS = {
+    'database': check_database,
+    'storage': check_storage,
+}
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Answer while the process is alive"""
+    return HttpResponse('ok', content_type='text/plain')
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Answer 200 when every dependency in CHECKS is reachable, else 503"""
+    results = {}
+    for name, check in CHECKS.items():
+        try:
+            check()
+        except Exception:
+            logger.exception('Readiness check %s failed', name)
+            results[name] = 'error'
+        else:
+            results[name] = 'ok'
+    ready = all(result == 'ok' for result in results.values())
+    return JsonResponse(results, status=200 if ready else 503)
@@ -0,0 +1,428 @@
+"""Per endpoint latency and query count histograms
+
+InstrumentationMiddleware records, for every request resolved to a view,
+under a name like `PostViewSet.list`:
+
+- wall: time spent in the middleware chain below it, in microseconds
+- queries: the number of database queries
+- db: time spent in those queries, in microseconds. Queries run
+  concurrently by core.fanout all add up, so it can exceed wall.
+- serialization: time from the start of the view to the rendered response
+  that was not spent in the database, in microseconds. For the DRF views
+  of this project that is building serializer data and rendering it.
+- pool_wait: time spent waiting for a connection from the pool of the
+  core.db backends, in microseconds. Only recorded with those backends.
+- token_cache_hit: 1 when the request's token was found in the lookup
+  cache of core.authentication, 0 when it had to be queried. Only
+  recorded for token authenticated requests; its mean is the hit rate.
+
+Every thread records into histograms of its own, so the request path never
+takes a lock; reports merge them. The tables of finished threads, like the
+thread of each ASGI request, are folded into one table and dropped. Each
+process writes its histograms to INSTRUMENTATION['REPORT_DIR'] now and
+then for the instrumentation_report command, and InstrumentationReportView
+serves the same report to admins.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+
+
+logger = logging.getLogger(__name__)
+
+# Metrics recorded in microseconds, reported in milliseconds
+TIME_METRICS = ('wall', 'db', 'serialization', 'pool_wait')
+# Statements kept per request for the slow request log
+MAX_LOGGED_QUERIES = 1000
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers
+
+    Buckets are at most 1/16 of their value wide, so percentiles keep about
+    6% precision at any magnitude without storing samples.
+    """
+    SUB_BUCKET_BITS = 5
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value):
+        """Return the index of the bucket value falls into"""
+        shift = max(value.bit_length() - cls.SUB_BUCKET_BITS, 0)
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def bucket_floor(cls, index):
+        """Return the smallest value of the bucket at index"""
+        half = 1 << (cls.SUB_BUCKET_BITS - 1)
+        if index < 2 * half:
+            return index
+        shift = (index >> (cls.SUB_BUCKET_BITS - 1)) - 1
+        return (index - shift * half) << shift
+
+    def record(self, value):
+        """Add a value"""
+        value = int(value)
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add the values of another histogram"""
+        for index, count in list(other.counts.items()):
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Return an estimate of the value below which percent% fall"""
+        if not self.count:
+            return 0
+        rank = self.count * percent / 100
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                # Middle of the bucket, but never past the largest value
+                upper = self.bucket_floor(index + 1)
+                middle = (self.bucket_floor(index) + upper - 1) / 2
+                return min(middle, self.max)
+        return self.max
+
+    def summary(self, scale=1):
+        """Return count, mean, p50, p95, p99 and max, divided by scale"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count / scale if self.count else 0,
+            'p50': self.percentile(50) / scale,
+            'p95': self.percentile(95) / scale,
+            'p99': self.percentile(99) / scale,
+            'max': self.max / scale,
+        }
+
+    def to_dict(self):
+        return {
+            'counts': self.counts,
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(i): n for i, n in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
+
+
+def _merge_tables(target, table):
+    """Merge the histograms of table into target"""
+    for endpoint, metrics in list(table.items()):
+        for name, histogram in list(metrics.items()):
+            target.setdefault(endpoint, {}).setdefault(
+                name, Histogram()
+            ).merge(histogram)
+
+
+class Recorder:
+    """Histograms of each endpoint and metric for the current process"""
+
+    def __init__(self):
+        self._local = threading.local()
+        # (weak reference to the thread, its table) of each recording thread
+        self._tables = []
+        # Merged tables of threads that have finished
+        self._finished = {}
+        # Only taken when a thread records for the first time and to report
+        self._lock = threading.Lock()
+        self.last_dump = time.monotonic()
+
+    def _table(self):
+        table = getattr(self._local, 'table', None)
+        if table is None:
+            table = self._local.table = {}
+            thread = weakref.ref(threading.current_thread())
+            with self._lock:
+                self._collect()
+                self._tables.append((thread, table))
+        return table
+
+    def _collect(self):
+        """Fold the tables of finished threads into _finished, under the lock
+
+        A finished thread records no more, so its table can be read safely.
+        """
+        alive = []
+        for reference, table in self._tables:
+            thread = reference()
+            if thread is not None and thread.is_alive():
+                alive.append((reference, table))
+            else:
+                _merge_tables(self._finished, table)
+        self._tables = alive
+
+    def record(self, endpoint, **values):
+        """Record a value of each metric for endpoint"""
+        metrics = self._table().setdefault(endpoint, {})
+        for name, value in values.items():
+            histogram = metrics.get(name)
+            if histogram is None:
+                histogram = metrics[name] = Histogram()
+            histogram.record(value)
+
+    def snapshot(self):
+        """Return {endpoint: {metric: Histogram}} merged across threads"""
+        merged = {}
+        with self._lock:
+            self._collect()
+            _merge_tables(merged, self._finished)
+            tables = [table for _, table in self._tables]
+        for table in tables:
+            _merge_tables(merged, table)
+        return merged
+
+    def reset(self):
+        """Forget every recorded value"""
+        with self._lock:
+            self._finished.clear()
+            for _, table in self._tables:
+                table.clear()
+
+    def dump(self, directory):
+        """Write the histograms of this process to directory"""
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            endpoint: {
+                name: histogram.to_dict()
+                for name, histogram in metrics.items()
+            }
+            for endpoint, metrics in self.snapshot().items()
+        }
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        # Threads of a process may dump at the same time
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary, path)
+        self.last_dump = time.monotonic()
+
+
+recorder = Recorder()
+
+
+def load_histograms(directory, live=True):
+    """Merge the histograms dumped by every process in directory
+
+    With live, the current histograms of this process replace its dump.
+    """
+    merged = {}
+
+    def add(snapshot):
+        for endpoint, metrics in snapshot.items():
+            for name, histogram in metrics.items():
+                merged.setdefault(endpoint, {}).setdefault(
+                    name, Histogram()
+                ).merge(histogram)
+
+    own = f'{os.getpid()}.json'
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    for name in names:
+        if not name.endswith('.json') or (live and name == own):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        add({
+            endpoint: {
+                metric: Histogram.from_dict(histogram)
+                for metric, histogram in metrics.items()
+            }
+            for endpoint, metrics in data.items()
+        })
+    if live:
+        add(recorder.snapshot())
+
+    return merged
+
+
+def summarize(histograms):
+    """Return {endpoint: {metric: summary}} with times in milliseconds"""
+    return {
+        endpoint: {
+            name: histogram.summary(
+                scale=1000 if name in TIME_METRICS else 1
+            )
+            for name, histogram in sorted(metrics.items())
+        }
+        for endpoint, metrics in sorted(histograms.items())
+    }
+
+
+def endpoint_name(request):
+    """Return the name histograms of a request are kept under, or None"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return f'{match.view_name}.{request.method.lower()}'
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class QueryLog:
+    """Database execute wrapper counting and timing the queries it runs
+
+    core.fanout runs it on several threads at once, hence the lock.
+    """
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.time = 0.0
+        self.keep_sql = keep_sql
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.count += 1
+                self.time += duration
+                if self.keep_sql and \
+                        len(self.statements) < MAX_LOGGED_QUERIES:
+                    self.statements.append((duration, sql))
+
+
+def pool_wait():
+    """Return the seconds this thread's connections waited for their pools
+
+    None when no connection comes from a pool.
+    """
+    waits = [
+        connections[alias].pool_wait for alias in connections
+        if hasattr(connections[alias], 'pool_wait')
+    ]
+    return sum(waits) if waits else None
+
+
+class InstrumentationMiddleware:
+    """Record latency and query histograms of every request
+
+    Put it first in MIDDLEWARE so that wall time covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.INSTRUMENTATION
+        threshold = options['QUERY_LOG_THRESHOLD']
+        queries = QueryLog(keep_sql=threshold is not None)
+        request._instrumentation = {'queries': queries}
+        pool_wait_before = pool_wait()
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(queries)
+                )
+            start = time.perf_counter()
+            response = self.get_response(request)
+            end = time.perf_counter()
+
+        endpoint = endpoint_name(request)
+        if endpoint is None:
+            return response
+
+        view_start, db_before_view = request._instrumentation.get(
+            'view', (end, queries.time)
+        )
+        serialization = (end - view_start) - (queries.time - db_before_view)
+        metrics = {
+            'wall': (end - start) * 1e6,
+            'queries': queries.count,
+            'db': queries.time * 1e6,
+            'serialization': max(serialization, 0) * 1e6,
+        }
+        if pool_wait_before is not None:
+            metrics['pool_wait'] = (pool_wait() - pool_wait_before) * 1e6
+        token_cache_hit = getattr(request, 'token_cache_hit', None)
+        if token_cache_hit is not None:
+            metrics['token_cache_hit'] = int(token_cache_hit)
+        recorder.record(endpoint, **metrics)
+
+        if threshold is not None and queries.count > threshold:
+            logger.warning(
+                '%s %s made %d queries\n%s',
+                request.method, request.get_full_path(), queries.count,
+                '\n'.join(
+                    f'{duration * 1000:.2f} ms {sql}'
+                    for duration, sql in queries.statements
+                )
+            )
+
+        interval = options['REPORT_INTERVAL']
+        if interval is not None and \
+                time.monotonic() - recorder.last_dump >= interval:
+            try:
+                recorder.dump(options['REPORT_DIR'])
+            except OSError:
+                logger.exception('Could not write instrumentation report')
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, '_instrumentation', None)
+        if state is not None:
+            state['view'] = (time.perf_counter(), state['queries'].time)
+
+
+class InstrumentationReportView(APIView):
+    """Report latency and query histograms of every endpoint to admins"""
+    authentication_classes = (
+        CachedTokenAuthentication, SessionAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        if not settings.INSTRUMENTATION['ENDPOINT']:
+            raise NotFound()
+        return Response(summarize(
+            load_histograms(settings.INSTRUMENTATION['REPORT_DIR'])
+        ))
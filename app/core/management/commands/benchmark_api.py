@@ -0,0 +1,139 @@
+import json
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import benchmark
+from core.models import Post
+
+
+def _change(before, after):
+    """Return the change from before to after in percent"""
+    return (after / before - 1) * 100 if before else 0
+
+
+class Command(BaseCommand):
+    """Django command to load test the API against a seeded database"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Fraction of 10k users, 100k posts and 1M rates to seed'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='How many requests to measure per scenario'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='How many requests to send per scenario before measuring'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=sorted(benchmark.SCENARIOS),
+            help='Scenario to run, can be repeated. Defaults to all'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed for the data set and the requests'
+        )
+        parser.add_argument(
+            '--output', help='File to write the results to as JSON'
+        )
+        parser.add_argument(
+            '--compare', help='Results file of an earlier run to compare to'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the seeded database to reuse on the next run'
+        )
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, results, path):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(
+            f'\nCompared to {baseline.get("commit") or path}:'
+        )
+        for scenario, result in results['scenarios'].items():
+            before = baseline['scenarios'].get(scenario)
+            if before is None:
+                continue
+            p95 = (before['latency_ms']['p95'], result['latency_ms']['p95'])
+            rate = (before['throughput'], result['throughput'])
+            self.stdout.write(
+                f'{scenario:<16} p95 {p95[0]:.1f} -> {p95[1]:.1f} ms '
+                f'({_change(*p95):+.0f}%)  throughput {rate[0]:.1f} -> '
+                f'{rate[1]:.1f}/s ({_change(*rate):+.0f}%)'
+            )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        keepdb = options['keepdb']
+        # Seed and measure in a database of its own, like the test runner
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False
+        )
+        try:
+            volumes = None
+            if not Post.objects.exists():
+                self.stdout.write(
+                    f'Seeding database at scale {options["scale"]}...'
+                )
+                start = time.perf_counter()
+                volumes = benchmark.seed(options['scale'], options['seed'])
+                self.stdout.write(
+                    f'Seeded in {time.perf_counter() - start:.1f} s'
+                )
+
+            results = {
+                'commit': self._commit(),
+                'timestamp': time.time(),
+                'database': connection.vendor,
+                'scale': options['scale'],
+                'volumes': volumes,
+                'scenarios': benchmark.run_scenarios(
+                    options['scenarios'], options['requests'],
+                    options['warmup'], options['seed']
+                ),
+            }
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=keepdb
+            )
+
+        self.stdout.write(
+            f'{"scenario":<16} {"errors":>6} {"req/s":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"queries":>8}'
+        )
+        for scenario, result in results['scenarios'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{scenario:<16} {result["errors"]:>6} '
+                f'{result["throughput"]:>8.1f} {latency["p50"]:>8.1f} '
+                f'{latency["p95"]:>8.1f} {latency["p99"]:>8.1f} '
+                f'{result["queries"]["mean"]:>8.1f}'
+            )
+
+        if options['compare']:
+            self._compare(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Results written to {options["output"]}'
+            ))
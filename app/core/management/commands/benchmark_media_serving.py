@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from core import media
+
+
+class Command(BaseCommand):
+    """Django command to compare worker CPU spent serving media files"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=4 * 1024 * 1024,
+            help='Size in bytes of the served file'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='How many requests to serve on each path'
+        )
+
+    def _measure(self, name, requests, send, backend):
+        """Return worker CPU seconds per request and the bytes sent"""
+        factory = RequestFactory()
+        sent = 0
+        with override_settings(MEDIA_SERVING={
+            'BACKEND': backend,
+            'ACCEL_REDIRECT_LOCATION': '/protected-media/',
+            'MAX_AGE': 3600,
+        }):
+            start = time.process_time()
+            for _ in range(requests):
+                response = media.serve(factory.get('/media/' + name), name)
+                sent += send(response)
+                response.close()
+        return (time.process_time() - start) / requests, sent / requests
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        media_root = tempfile.mkdtemp()
+        sink = os.open(os.devnull, os.O_WRONLY)
+
+        def iterate(response):
+            # What WSGI servers without wsgi.file_wrapper do
+            return sum(os.write(sink, chunk) for chunk in response)
+
+        def sendfile(response):
+            # What gunicorn's wsgi.file_wrapper does
+            f = response.file_to_stream
+            offset, count = f.tell(), int(response['Content-Length'])
+            while count:
+                written = os.sendfile(sink, f.fileno(), offset, count)
+                offset += written
+                count -= written
+            return int(response['Content-Length'])
+
+        def offload(response):
+            # The front server sends the file
+            return 0
+
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                name = 'benchmark.jpg'
+                with open(os.path.join(media_root, name), 'wb') as f:
+                    f.write(os.urandom(options['size']))
+
+                paths = (
+                    ('python, iterated', iterate, 'python'),
+                    ('python, os.sendfile', sendfile, 'python'),
+                    ('x-accel-redirect', offload, 'x-accel-redirect'),
+                )
+                for label, send, backend in paths:
+                    cpu, sent = self._measure(
+                        name, options['requests'], send, backend
+                    )
+                    self.stdout.write(
+                        f'{label}: {cpu * 1000:.3f} ms CPU per request, '
+                        f'{sent / 1024 / 1024:.1f} MB sent by the worker'
+                    )
+        finally:
+            os.close(sink)
+            shutil.rmtree(media_root)
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand
+
+from core.hashers import hashing_pool
+
+
+class Command(BaseCommand):
+    """Django command to measure logins per second for each hasher"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seconds', type=float, default=3.0,
+            help='How long to measure each hasher for'
+        )
+
+    def _rate(self, verify, seconds, concurrency=1):
+        """Return how many verifications per second verify sustains"""
+        deadline = time.perf_counter() + seconds
+
+        def worker():
+            count = 0
+            while time.perf_counter() < deadline:
+                verify()
+                count += 1
+            return count
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            total = sum(f.result() for f in [
+                executor.submit(worker) for _ in range(concurrency)
+            ])
+        return total / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        seconds = options['seconds']
+        password = 'correct horse battery staple'
+
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode(password, hasher.salt())
+            except ValueError:
+                self.stdout.write(f'{hasher.algorithm}: library not installed')
+                continue
+            rate = self._rate(
+                lambda: hasher.verify(password, encoded), seconds
+            )
+            self.stdout.write(
+                f'{hasher.algorithm}: {rate:.1f} logins/s per core'
+            )
+
+        preferred = get_hasher('default')
+        encoded = preferred.encode(password, preferred.salt())
+        concurrency = hashing_pool.workers + \
+            settings.PASSWORD_HASHING_POOL['QUEUE_SIZE']
+        rate = self._rate(
+            lambda: hashing_pool.run(preferred.verify, password, encoded),
+            seconds,
+            concurrency=concurrency,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{preferred.algorithm} via hashing pool '
+            f'({hashing_pool.workers} workers): {rate:.1f} logins/s'
+        ))
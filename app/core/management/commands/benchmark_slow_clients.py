@@ -0,0 +1,105 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import benchmark
+from core.models import Post
+
+
+class Command(BaseCommand):
+    """Django command to compare WSGI and ASGI serving of slow clients"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=0.01,
+            help='Fraction of 10k users, 100k posts and 1M rates to seed'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=400,
+            help='How many requests to send per scenario and server'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=64,
+            help='How many clients send requests at the same time'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='How many threads handle WSGI requests'
+        )
+        parser.add_argument(
+            '--delay', type=float, default=0.05,
+            help='Seconds a client takes to send a request, and to read '
+                 'its response'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=benchmark.READ_SCENARIOS,
+            help='Scenario to run, can be repeated. Defaults to all'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed for the data set and the requests'
+        )
+        parser.add_argument(
+            '--output', help='File to write the results to as JSON'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        results = {
+            'timestamp': time.time(),
+            'database': connection.vendor,
+            'clients': options['clients'],
+            'threads': options['threads'],
+            'delay': options['delay'],
+            'scenarios': {},
+        }
+        try:
+            if not Post.objects.exists():
+                self.stdout.write(
+                    f'Seeding database at scale {options["scale"]}...'
+                )
+                benchmark.seed(options['scale'], options['seed'])
+
+            for scenario in options['scenarios'] or benchmark.READ_SCENARIOS:
+                results['scenarios'][scenario] = {
+                    server: benchmark.run_slow_clients(
+                        server, scenario, options['requests'],
+                        options['clients'], options['threads'],
+                        options['delay'], options['seed']
+                    )
+                    for server in benchmark.SERVERS
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            f'{"scenario":<16} {"server":<6} {"errors":>6} {"req/s":>8} '
+            f'{"p50 ms":>8} {"p95 ms":>8}'
+        )
+        for scenario, servers in results['scenarios'].items():
+            for server, result in servers.items():
+                latency = result['latency_ms']
+                self.stdout.write(
+                    f'{scenario:<16} {server:<6} {result["errors"]:>6} '
+                    f'{result["throughput"]:>8.1f} {latency["p50"]:>8.1f} '
+                    f'{latency["p95"]:>8.1f}'
+                )
+            wsgi, asgi = (servers[server]['throughput'] for server in
+                          benchmark.SERVERS)
+            self.stdout.write(
+                f'{scenario:<16} asgi/wsgi throughput '
+                f'{asgi / wsgi if wsgi else 0:.1f}x'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Results written to {options["output"]}'
+            ))
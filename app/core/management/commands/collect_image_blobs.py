@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.storage import blob_root, image_storage
+
+
+class Command(BaseCommand):
+    """Django command to delete image blobs no longer referenced"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int,
+            default=settings.IMAGE_STORAGE['GC_GRACE_PERIOD'],
+            help='Keep unreferenced files younger than this many seconds',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        # Variants belong to their original, so compare names by root
+        referenced = {
+            blob_root(name) for name in image_storage.reference_counts()
+        }
+        deleted = freed = 0
+        for name, size, age in image_storage.blobs():
+            if blob_root(name) in referenced:
+                continue
+            if age < options['grace_period']:
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                image_storage.purge(name)
+            deleted += 1
+            freed += size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} unreferenced files, {freed} bytes'
+        ))
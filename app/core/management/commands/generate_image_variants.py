@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core import thumbnails
+from core.models import Image, Post, User
+
+
+class Command(BaseCommand):
+    """Django command to create missing variants of uploaded images"""
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        sources = (
+            (Image, 'imageRef'),
+            (Post, 'imageUrl'),
+            (User, 'avatar'),
+        )
+        checked = created = failed = 0
+        for model, field in sources:
+            storage = model._meta.get_field(field).storage
+            names = model.objects.exclude(
+                **{f'{field}__isnull': True}
+            ).exclude(**{field: ''}).values_list(field, flat=True)
+            for name in names.iterator(chunk_size=500):
+                checked += 1
+                try:
+                    created += len(
+                        thumbnails.generate_variants(name, storage)
+                    )
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} images, created {created} variants, '
+            f'{failed} failed'
+        ))
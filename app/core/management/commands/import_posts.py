@@ -0,0 +1,50 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from post import ndjson
+
+
+class Command(BaseCommand):
+    """Django command to import an NDJSON export into a user's account"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the importing user')
+        parser.add_argument(
+            'path', help='NDJSON file to import, or - for standard input'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ndjson.BATCH_SIZE,
+            help='How many records to write per transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        if options['path'] == '-':
+            result = ndjson.import_records(
+                user, sys.stdin.buffer, options['batch_size']
+            )
+        else:
+            with open(options['path'], 'rb') as f:
+                result = ndjson.import_records(
+                    user, f, options['batch_size']
+                )
+
+        for error in result['errors']:
+            self.stderr.write(
+                f'line {error["line"]}: {json.dumps(error["errors"])}'
+            )
+        imported = ', '.join(
+            f'{count} {record_type}s'
+            for record_type, count in result['imported'].items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported}, skipped {result["invalid"]} invalid lines'
+        ))
@@ -0,0 +1,78 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import load_histograms, summarize
+
+
+def token_hit_rate(metrics):
+    """Return the token cache hit rate of an endpoint as text, or '-'"""
+    hits = metrics.get('token_cache_hit')
+    if not hits or not hits['count']:
+        return '-'
+    return f'{hits["mean"] * 100:.1f}'
+
+
+class Command(BaseCommand):
+    """Django command to report latency and queries of every endpoint"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort', default='wall',
+            choices=(
+                'wall', 'queries', 'db', 'serialization', 'pool_wait'
+            ),
+            help='Metric whose p95 orders the endpoints'
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the full report as JSON'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete the histograms written by server processes'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        directory = settings.INSTRUMENTATION['REPORT_DIR']
+        if options['reset']:
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            for name in names:
+                if name.endswith('.json'):
+                    os.remove(os.path.join(directory, name))
+            self.stdout.write(self.style.SUCCESS('Instrumentation reset'))
+            return
+
+        report = summarize(load_histograms(directory, live=False))
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        sort = options['sort']
+        # pool_wait is only recorded with the pooled database backends
+        endpoints = sorted(
+            report,
+            key=lambda endpoint: report[endpoint].get(sort, {}).get('p95', 0),
+            reverse=True
+        )
+        self.stdout.write(
+            f'{"endpoint":<40} {"requests":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"q p95":>8} {"db p95":>8} {"ser p95":>8} '
+            f'{"pool p95":>8} {"tok hit%":>8}'
+        )
+        for endpoint in endpoints:
+            metrics = report[endpoint]
+            self.stdout.write(
+                f'{endpoint:<40} {metrics["wall"]["count"]:>8} '
+                f'{metrics["wall"]["p50"]:>8.1f} '
+                f'{metrics["wall"]["p95"]:>8.1f} '
+                f'{metrics["wall"]["p99"]:>8.1f} '
+                f'{metrics["queries"]["p95"]:>8.0f} '
+                f'{metrics["db"]["p95"]:>8.1f} '
+                f'{metrics["serialization"]["p95"]:>8.1f} '
+                f'{metrics.get("pool_wait", {}).get("p95", 0):>8.1f} '
+                f'{token_hit_rate(metrics):>8}'
+            )
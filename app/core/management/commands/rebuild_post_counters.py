@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, When
+)
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Post, PostComment, PostRate
+
+
+class Command(BaseCommand):
+    """Django command to recompute the rating and comment counters of posts"""
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        rates = PostRate.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post')
+        rate_sum = rates.annotate(total=Sum('rate')).values('total')
+        rate_count = rates.annotate(total=Count('id')).values('total')
+        comment_count = PostComment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            total=Count('id')
+        ).values('total')
+
+        with transaction.atomic():
+            updated = Post.objects.update(
+                rate_sum=Coalesce(
+                    Subquery(rate_sum, output_field=IntegerField()), 0
+                ),
+                rate_count=Coalesce(
+                    Subquery(rate_count, output_field=IntegerField()), 0
+                ),
+                comment_count=Coalesce(
+                    Subquery(comment_count, output_field=IntegerField()), 0
+                ),
+            )
+            Post.objects.update(avg_rate=Case(
+                When(rate_count=0, then=None),
+                default=Cast(F('rate_sum'), FloatField()) / F('rate_count'),
+                output_field=FloatField(),
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt counters for {updated} posts'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import search
+
+
+class Command(BaseCommand):
+    """Django command to repopulate the post full-text search index"""
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            search.rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,169 @@
+"""Serving of uploaded files under MEDIA_URL
+
+settings.MEDIA_SERVING['BACKEND'] picks how the bytes leave the server:
+
+- 'x-accel-redirect' (nginx) and 'x-sendfile' (Apache, lighttpd) answer
+  with headers only and let the front server send the file, Range
+  requests included.
+- 'python' sends the file from the worker. Whole files and ranges up to
+  the end of the file go out as a FileResponse, which WSGI servers with a
+  sendfile based wsgi.file_wrapper, like gunicorn, copy to the socket
+  without reading them into Python.
+
+Either way the worker checks the path, answers conditional requests and
+sets long-lived cache headers, as uploaded files are never rewritten.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return the (start, end) byte positions asked for by a Range header
+
+    end is inclusive. Return None when the whole file should be sent, and
+    raise ValueError when the range cannot be satisfied. Multiple ranges
+    are answered with the whole file, which RFC 7233 allows.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, the last `last` bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class MediaFileResponse(FileResponse):
+    """FileResponse reading larger blocks when it has to read at all"""
+    block_size = CHUNK_SIZE
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _range_applies(request, etag, last_modified):
+    """Return whether If-Range, if any, still matches the file"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _file_response(request, path, size, etag, last_modified):
+    header = request.META.get('HTTP_RANGE')
+    if not header or not _range_applies(request, etag, last_modified):
+        return MediaFileResponse(open(path, 'rb'))
+
+    try:
+        byte_range = parse_range(header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return MediaFileResponse(open(path, 'rb'))
+
+    start, end = byte_range
+    if end == size - 1:
+        # Still a plain file from its current offset, so sendfile applies
+        f = open(path, 'rb')
+        f.seek(start)
+        response = MediaFileResponse(f, status=206)
+    else:
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1), status=206
+        )
+        response['Content-Type'] = \
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _offloaded_response(path, name):
+    backend = settings.MEDIA_SERVING['BACKEND']
+    response = HttpResponse(
+        content_type=mimetypes.guess_type(name)[0] or
+        'application/octet-stream'
+    )
+    if backend == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        location = settings.MEDIA_SERVING['ACCEL_REDIRECT_LOCATION']
+        response['X-Accel-Redirect'] = location.rstrip('/') + '/' + name
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Serve the file called path from MEDIA_ROOT"""
+    name = os.path.normpath(path).replace(os.sep, '/').lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such file')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('No such file')
+
+    size = stat_result.st_size
+    last_modified = int(stat_result.st_mtime)
+    etag = f'"{size:x}-{stat_result.st_mtime_ns:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_SERVING['BACKEND'] == 'python':
+            response = _file_response(
+                request, full_path, size, etag, last_modified
+            )
+            response['Accept-Ranges'] = 'bytes'
+        else:
+            response = _offloaded_response(full_path, name)
+    if response.status_code == 416:
+        return response
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    cache_control = {
+        'public': True, 'max_age': settings.MEDIA_SERVING['MAX_AGE']
+    }
+    if name.startswith(settings.IMAGE_STORAGE['PREFIX'] + '/'):
+        # Blob names are content digests, so they can never change
+        cache_control['immutable'] = True
+    patch_cache_control(response, **cache_control)
+    return response
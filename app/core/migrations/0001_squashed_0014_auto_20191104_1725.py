@@ -0,0 +1,143 @@
+# Generated by Django 2.2.5 on 2026-10-18 03:18
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """The schema of 0001 to 0014, each table created in its final shape
+
+    A new database is built from this instead of replaying the early
+    migrations, most of which rebuild the user and post tables on SQLite.
+    The defaults those used to fill existing rows are left out.
+    """
+
+    replaces = [
+        ('core', '0001_initial'),
+        ('core', '0002_tag'),
+        ('core', '0003_ingredient'),
+        ('core', '0004_recipe'),
+        ('core', '0005_auto_20191026_2127'),
+        ('core', '0006_post_image'),
+        ('core', '0007_auto_20191029_1724'),
+        ('core', '0008_auto_20191029_2018'),
+        ('core', '0009_auto_20191029_2021'),
+        ('core', '0010_auto_20191029_2101'),
+        ('core', '0011_auto_20191029_2103'),
+        ('core', '0012_auto_20191029_2107'),
+        ('core', '0013_auto_20191103_1044'),
+        ('core', '0014_auto_20191104_1725'),
+    ]
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('email', models.EmailField(max_length=255, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.Group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.Permission', verbose_name='user permissions')),
+                ('age', models.IntegerField(null=True)),
+                ('avatar', models.ImageField(null=True, upload_to=core.models.post_image_file_path)),
+                ('birthday', models.DateField(null=True)),
+                ('country', models.CharField(blank=True, max_length=255)),
+                ('creationDate', models.DateTimeField(auto_now_add=True)),
+                ('firstConnection', models.DateField(null=True)),
+                ('firstname', models.CharField(blank=True, max_length=255)),
+                ('lastConnection', models.DateField(null=True)),
+                ('lastname', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(max_length=255)),
+                ('updatedDate', models.DateTimeField(auto_now=True)),
+                ('username', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Post',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('time_minutes', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('tags', models.ManyToManyField(to='core.Tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('imageUrl', models.ImageField(null=True, upload_to=core.models.post_image_file_path)),
+                ('category', models.CharField(blank=True, max_length=255)),
+                ('content', models.CharField(max_length=255)),
+                ('creationDate', models.DateTimeField(auto_now_add=True)),
+                ('updatedDate', models.DateTimeField(auto_now=True)),
+                ('starCount', models.IntegerField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rate', models.IntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Address',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('street', models.CharField(blank=True, max_length=255)),
+                ('city', models.CharField(blank=True, max_length=255)),
+                ('country', models.CharField(blank=True, max_length=255)),
+                ('postcode', models.IntegerField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostComment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('text', models.CharField(blank=True, max_length=255)),
+                ('imageRef', models.CharField(blank=True, max_length=255)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Image',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imageRef', models.ImageField(null=True, upload_to=core.models.post_image_file_path)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='core.Post')),
+            ],
+        ),
+    ]
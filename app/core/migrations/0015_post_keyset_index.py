@@ -0,0 +1,17 @@
+# Generated by Django 2.2.5 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_auto_20191104_1725'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-creationDate', '-id'], name='core_post_user_created_idx'),
+        ),
+    ]
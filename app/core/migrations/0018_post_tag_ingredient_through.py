@@ -0,0 +1,61 @@
+# Generated by Django 2.2.5 on 2026-10-18 02:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_post_comment_count'),
+    ]
+
+    operations = [
+        # Post.tags already has its table; only the state learns about
+        # the explicit through model that now owns it.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PostTag',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Post')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Tag')),
+                    ],
+                    options={
+                        'db_table': 'core_post_tags',
+                        'unique_together': {('post', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='tags',
+                    field=models.ManyToManyField(through='core.PostTag', to='core.Tag'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', 'post'], name='core_posttag_tag_post_idx'),
+        ),
+        migrations.CreateModel(
+            name='PostIngredient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Ingredient')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Post')),
+            ],
+            options={
+                'unique_together': {('post', 'ingredient')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postingredient',
+            index=models.Index(fields=['ingredient', 'post'], name='core_posting_ingr_post_idx'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='ingredients',
+            field=models.ManyToManyField(through='core.PostIngredient', to='core.Ingredient'),
+        ),
+    ]
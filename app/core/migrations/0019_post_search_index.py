@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index for the current database vendor"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE core_post_fts '
+            'USING fts5(title, content, category)'
+        )
+        schema_editor.execute(
+            'INSERT INTO core_post_fts (rowid, title, content, category) '
+            'SELECT id, title, content, category FROM core_post'
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE core_post ADD FULLTEXT INDEX core_post_search_idx '
+            '(title, content, category)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    """Drop the full-text index for the current database vendor"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE core_post_fts')
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE core_post DROP INDEX core_post_search_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_post_tag_ingredient_through'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.5 on 2026-10-18 02:58
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_tag_updateddate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='imageRef',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.post_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='imageUrl',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.post_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.post_image_file_path),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fold tags and ingredients sharing a user and name into the oldest"""
+    sources = (
+        ('Tag', 'PostTag', 'tag'),
+        ('Ingredient', 'PostIngredient', 'ingredient'),
+    )
+    for model_name, through_name, field in sources:
+        model = apps.get_model('core', model_name)
+        through = apps.get_model('core', through_name)
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'), rows=Count('id')
+        ).filter(rows__gt=1)
+        for duplicate in duplicates:
+            keep = duplicate['keep']
+            extra = model.objects.filter(
+                user=duplicate['user'], name=duplicate['name']
+            ).exclude(id=keep)
+            for extra_id in extra.values_list('id', flat=True):
+                links = through.objects.filter(**{f'{field}_id': extra_id})
+                linked = list(through.objects.filter(
+                    **{f'{field}_id': keep}
+                ).values_list('post_id', flat=True))
+                # Posts already linked to the survivor keep a single link
+                links.filter(post_id__in=linked).delete()
+                links.update(**{f'{field}_id': keep})
+            extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+    ]
@@ -1,10 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, FloatField, When
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
 import uuid
 import os
 
+from core import cache, search, thumbnails
+from core.storage import image_storage
+
 
 def post_image_file_path(instance, filename):
     """Generate file path for new post image"""
@@ -54,7 +61,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     birthday = models.DateField(null=True)
     age = models.IntegerField(null=True)
     status = models.CharField(max_length=255)
-    avatar = models.ImageField(null=True, upload_to=post_image_file_path)
+    avatar = models.ImageField(
+        null=True, upload_to=post_image_file_path, storage=image_storage
+    )
 
     objects = UserManager()
 
@@ -68,6 +77,15 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updatedDate = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Bulk imports rely on it for get-or-create by name
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='core_tag_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -81,6 +99,15 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            # Bulk imports rely on it for get-or-create by name
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -95,20 +122,102 @@ class Post(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
-    #ingredients = models.ManyToManyField('Ingredient')
-    tags = models.ManyToManyField('Tag')
-    imageUrl= models.ImageField(null=True, upload_to=post_image_file_path)
+    ingredients = models.ManyToManyField('Ingredient', through='PostIngredient')
+    tags = models.ManyToManyField('Tag', through='PostTag')
+    imageUrl= models.ImageField(
+        null=True, upload_to=post_image_file_path, storage=image_storage
+    )
     #image = models.ImageField(null=True, upload_to=post_image_file_path)
     starCount = models.IntegerField(null=True)
+    rate_sum = models.IntegerField(default=0)
+    rate_count = models.IntegerField(default=0)
+    avg_rate = models.FloatField(null=True, db_index=True)
+    comment_count = models.IntegerField(default=0)
     category = models.CharField(max_length=255, blank=True)
     creationDate = models.DateTimeField(auto_now_add=True)
     updatedDate = models.DateTimeField(auto_now=True, blank=True)
     content = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of a user's posts, newest first
+            models.Index(
+                fields=['user', '-creationDate', '-id'],
+                name='core_post_user_created_idx'
+            ),
+        ]
+
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def apply_rate_change(cls, post_id, sum_delta, count_delta):
+        """Shift the rating aggregates of a post in a single UPDATE"""
+        rate_sum = F('rate_sum') + sum_delta
+        rate_count = F('rate_count') + count_delta
+        # avg_rate goes first: MySQL evaluates SET assignments left to
+        # right, so later ones would see the already updated columns
+        cls.objects.filter(pk=post_id).update(
+            avg_rate=Case(
+                When(rate_count=-count_delta, then=None),
+                default=Cast(rate_sum, FloatField()) / rate_count,
+                output_field=FloatField(),
+            ),
+            rate_sum=rate_sum,
+            rate_count=rate_count,
+        )
+
+
+    @classmethod
+    def apply_comment_change(cls, post_id, count_delta):
+        """Shift the comment counter of a post in a single UPDATE"""
+        cls.objects.filter(pk=post_id).update(
+            comment_count=F('comment_count') + count_delta
+        )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, using, **kwargs):
+    """Refresh the search index entry of a saved post"""
+    search.index_post(instance, using=using)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, using, **kwargs):
+    """Drop a deleted post from the search index"""
+    search.unindex_post(instance, using=using)
+
+
+class PostTag(models.Model):
+    """Link between a post and one of its tags"""
+    post = models.ForeignKey('Post', on_delete=models.CASCADE)
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'core_post_tags'
+        unique_together = (('post', 'tag'),)
+        indexes = [
+            # Covers tag filters, which look up posts by tag
+            models.Index(fields=['tag', 'post'], name='core_posttag_tag_post_idx'),
+        ]
+
+
+class PostIngredient(models.Model):
+    """Link between a post and one of its ingredients"""
+    post = models.ForeignKey('Post', on_delete=models.CASCADE)
+    ingredient = models.ForeignKey('Ingredient', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = (('post', 'ingredient'),)
+        indexes = [
+            # Covers ingredient filters, which look up posts by ingredient
+            models.Index(
+                fields=['ingredient', 'post'],
+                name='core_posting_ingr_post_idx'
+            ),
+        ]
+
 
 class Image(models.Model):
     """ Image of post """
@@ -117,7 +226,9 @@ class Image(models.Model):
         related_name='images',
         on_delete=models.CASCADE
     )
-    imageRef = models.ImageField(null=True, upload_to=post_image_file_path)
+    imageRef = models.ImageField(
+        null=True, upload_to=post_image_file_path, storage=image_storage
+    )
 
 
 class Address(models.Model):
@@ -143,10 +254,32 @@ class PostComment(models.Model):
     )
     post = models.ForeignKey(
         'Post',
-        #related_name='images',
+        related_name='comments',
         on_delete=models.CASCADE
     )
 
+    def save(self, *args, **kwargs):
+        """Save the comment and keep the post comment counter in step"""
+        with transaction.atomic(using=kwargs.get('using')):
+            previous_post_id = None
+            if self.pk is not None:
+                previous_post_id = PostComment.objects.filter(
+                    pk=self.pk
+                ).values_list('post_id', flat=True).first()
+            super().save(*args, **kwargs)
+
+            if previous_post_id != self.post_id:
+                if previous_post_id is not None:
+                    Post.apply_comment_change(previous_post_id, -1)
+                Post.apply_comment_change(self.post_id, 1)
+
+
+@receiver(post_delete, sender=PostComment)
+def remove_post_comment(sender, instance, **kwargs):
+    """Take a deleted comment out of the post comment counter"""
+    Post.apply_comment_change(instance.post_id, -1)
+
+
 class PostRate(models.Model):
     """ PostRate object """
     rate = models.IntegerField()
@@ -156,6 +289,81 @@ class PostRate(models.Model):
     )
     post = models.ForeignKey(
         'Post',
-        #related_name='images',
+        related_name='rates',
         on_delete=models.CASCADE
-    )
\ No newline at end of file
+    )
+
+    def save(self, *args, **kwargs):
+        """Save the rate and keep the post rating aggregates in step"""
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = None
+            if self.pk is not None:
+                previous = PostRate.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values('post_id', 'rate').first()
+            super().save(*args, **kwargs)
+
+            if previous is None:
+                Post.apply_rate_change(self.post_id, self.rate, 1)
+            elif previous['post_id'] != self.post_id:
+                Post.apply_rate_change(
+                    previous['post_id'], -previous['rate'], -1
+                )
+                Post.apply_rate_change(self.post_id, self.rate, 1)
+            elif previous['rate'] != self.rate:
+                Post.apply_rate_change(
+                    self.post_id, self.rate - previous['rate'], 0
+                )
+
+
+@receiver(post_delete, sender=PostRate)
+def remove_post_rate(sender, instance, **kwargs):
+    """Take a deleted rate out of the post rating aggregates
+
+    Handled as a signal so queryset and cascading deletes are counted too.
+    """
+    Post.apply_rate_change(instance.post_id, -instance.rate, -1)
+
+
+def _owner_id(instance):
+    """Return the id of the user whose API responses show instance"""
+    if isinstance(instance, User):
+        return instance.pk
+    if isinstance(instance, (Image, PostComment, PostRate)):
+        return Post.objects.filter(
+            pk=instance.post_id
+        ).values_list('user_id', flat=True).first()
+    return instance.user_id
+
+
+def expire_owner_responses(sender, instance, **kwargs):
+    """Invalidate the cached API responses of the owner of instance"""
+    owner_id = _owner_id(instance)
+    if owner_id is not None:
+        cache.expire_user_responses(owner_id)
+
+
+for model in (User, Tag, Ingredient, Post, Image, PostComment, PostRate):
+    post_save.connect(expire_owner_responses, sender=model)
+    post_delete.connect(expire_owner_responses, sender=model)
+for through in (Post.tags.through, Post.ingredients.through):
+    m2m_changed.connect(expire_owner_responses, sender=through)
+
+
+
+def schedule_image_variants(sender, instance, update_fields=None, **kwargs):
+    """Generate resized variants of the images saved with instance"""
+    for field in IMAGE_FIELDS[sender]:
+        if update_fields is not None and field not in update_fields:
+            continue
+        image = getattr(instance, field)
+        thumbnails.schedule_variants(image.name, image.storage)
+
+
+IMAGE_FIELDS = {
+    User: ('avatar',),
+    Post: ('imageUrl',),
+    Image: ('imageRef',),
+}
+for model in IMAGE_FIELDS:
+    post_save.connect(schedule_image_variants, sender=model)
@@ -0,0 +1,286 @@
+"""Database connection pool
+
+Django opens a database connection per thread and, with CONN_MAX_AGE = 0,
+closes it at the end of every request. The backends in core.db borrow
+their connections from a ConnectionPool shared by the threads of a process
+instead, and give them back when Django closes them, so requests skip the
+connection handshake.
+
+The pool holds at most MAX_SIZE connections. Checking one out waits up to
+TIMEOUT seconds for one to come back once all are in use, then fails with
+PoolTimeout. A connection is pinged before it is handed out and replaced
+once it is MAX_AGE seconds old or has been checked out MAX_USES times.
+One a database error occurred on during its checkout is closed rather
+than given back, even when Django found it usable afterwards.
+Time spent waiting is added to the pool_wait of the checking out
+DatabaseWrapper, which core.instrumentation reports per endpoint.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,
+    'MAX_AGE': 300,
+    'MAX_USES': 1000,
+    'TIMEOUT': 10,
+}
+
+
+class PoolTimeout(OperationalError):
+    """No pooled connection was returned in time"""
+
+
+class PooledConnection:
+    """A connection of a pool with its age and number of checkouts"""
+    __slots__ = ('connection', 'created', 'uses', 'waited')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = time.monotonic()
+        self.uses = 0
+        # Seconds the latest checkout waited for it
+        self.waited = 0.0
+
+
+class ConnectionPool:
+    """Bounded pool of connections made by connect
+
+    check is called with a connection before it is reused and should raise
+    if the connection is broken.
+    """
+
+    def __init__(self, connect, check, max_size, max_age, max_uses, timeout):
+        self.connect = connect
+        self.check = check
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        # Connections inherited from a parent process are its own: forget
+        # them without closing, closing would end the parent's sessions
+        self.pid = os.getpid()
+        self.size = 0
+        self._idle = deque()
+        self._in_use = {}
+        self.stats = {
+            'connects': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'failed_checks': 0,
+        }
+
+    def _expired(self, pooled):
+        return (
+            time.monotonic() - pooled.created >= self.max_age or
+            pooled.uses >= self.max_uses
+        )
+
+    def _discard(self, pooled, reason):
+        """Close a connection and free its place, counting it in reason"""
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self.size -= 1
+            self.stats[reason] += 1
+            self._condition.notify()
+
+    def acquire(self):
+        """Check out a connection, return its PooledConnection
+
+        The pool is only locked to pick a connection. Pinging or closing it
+        happens outside, so a slow server doesn't hold up the other threads.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._condition:
+                if self.pid != os.getpid():
+                    self._reset()
+                waited = False
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection free after '
+                            f'{self.timeout} s, all {self.max_size} in use'
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+                if waited:
+                    self.stats['waits'] += 1
+
+                if self._idle:
+                    # Most recently returned first, the others may expire.
+                    # It keeps its place in size while being checked.
+                    pooled = self._idle.pop()
+                else:
+                    pooled = None
+                    self.size += 1
+
+            if pooled is None:
+                break
+            if self._expired(pooled):
+                self._discard(pooled, 'recycled')
+                continue
+            try:
+                self.check(pooled.connection)
+            except Exception:
+                self._discard(pooled, 'failed_checks')
+                continue
+            break
+
+        if pooled is None:
+            try:
+                pooled = PooledConnection(self.connect())
+            except BaseException:
+                with self._condition:
+                    self.size -= 1
+                    self._condition.notify()
+                raise
+
+        with self._condition:
+            pooled.uses += 1
+            self._in_use[id(pooled.connection)] = pooled
+            self.stats['checkouts'] += 1
+            if pooled.uses == 1:
+                self.stats['connects'] += 1
+        pooled.waited = time.monotonic() - start
+        return pooled
+
+    def release(self, connection, reusable=True):
+        """Give a connection back, closing it unless it can be reused"""
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+            if pooled is not None and reusable and not self._expired(pooled):
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+        if pooled is None:
+            # Checked out before a fork or a reset, not ours to keep
+            connection.close()
+            return
+        self._discard(pooled, 'recycled')
+
+    def close(self):
+        """Close every idle connection"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self.size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            try:
+                pooled.connection.close()
+            except Exception:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """Return the pool of key, made by factory the first time"""
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """Mixin for a DatabaseWrapper borrowing connections from a pool
+
+    Options of the pool are read from the POOL key of the database settings,
+    see POOL_DEFAULTS. Keep CONN_MAX_AGE at 0: Django then gives connections
+    back to the pool at the end of every request.
+    """
+    # Seconds this wrapper has waited for pooled connections
+    pool_wait = 0.0
+    # Whether an error occurred since the connection was checked out
+    _pooled_errors = False
+
+    @property
+    def errors_occurred(self):
+        return self._errors_occurred
+
+    @errors_occurred.setter
+    def errors_occurred(self, value):
+        # Django clears the flag again once is_usable() passes, the pool
+        # remembers the error until the connection is given back
+        self._errors_occurred = value
+        if value:
+            self._pooled_errors = True
+
+    def check_pooled_connection(self, connection):
+        """Raise if connection is no longer usable"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    @property
+    def pool(self):
+        settings = self.settings_dict
+        key = (
+            self.alias, settings['NAME'], settings['HOST'], settings['PORT'],
+            settings['USER']
+        )
+
+        def make_pool():
+            options = dict(POOL_DEFAULTS, **settings.get('POOL', {}))
+            params = self.get_connection_params()
+            return ConnectionPool(
+                lambda: super(PooledDatabaseWrapperMixin, self)
+                .get_new_connection(params),
+                self.check_pooled_connection,
+                max_size=options['MAX_SIZE'],
+                max_age=options['MAX_AGE'],
+                max_uses=options['MAX_USES'],
+                timeout=options['TIMEOUT'],
+            )
+        return get_pool(key, make_pool)
+
+    def get_new_connection(self, conn_params):
+        pooled = self.pool.acquire()
+        self._pooled_errors = False
+        self.pool_wait += pooled.waited
+        self._pooled_reused = pooled.uses > 1
+        return pooled.connection
+
+    def init_connection_state(self):
+        # Session settings outlive the checkout, set them once
+        if not getattr(self, '_pooled_reused', False):
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = not self._pooled_errors
+        try:
+            if reusable and not self.get_autocommit():
+                # Don't hand an open transaction to the next borrower
+                with self.wrap_database_errors:
+                    self.connection.rollback()
+        except Exception:
+            reusable = False
+            raise
+        finally:
+            self.pool.release(self.connection, reusable)
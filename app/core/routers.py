@@ -0,0 +1,115 @@
+"""Read replica routing with read-your-writes consistency
+
+Writes and most reads go to the primary database. Views using
+ReplicaReadMixin read from one of DATABASE_REPLICAS['ALIASES'] when
+handling a safe request. ReplicaRouter consults the current thread's state,
+so only the queries of those views move.
+
+Replicas lag behind the primary, so a user who just wrote would otherwise
+read their old data. ReplicaPinningMiddleware pins a user who made an
+unsafe request to the primary for PIN_SECONDS. The pins live in the
+CACHE_ALIAS cache, which must be shared by every process for pins to hold
+across them.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+_state = threading.local()
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the reads of a user to the primary for PIN_SECONDS"""
+    options = settings.DATABASE_REPLICAS
+    if options['ALIASES'] and options['PIN_SECONDS']:
+        caches[options['CACHE_ALIAS']].set(
+            _pin_key(user_id), time.time(), options['PIN_SECONDS']
+        )
+
+
+def is_pinned(user_id):
+    """Return whether the reads of a user must go to the primary"""
+    cache = caches[settings.DATABASE_REPLICAS['CACHE_ALIAS']]
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def current_replica():
+    """Return the replica reads of this thread go to, or None"""
+    return getattr(_state, 'replica', None)
+
+
+def use_replica(alias):
+    """Send the reads of this thread to alias, or to the primary if None"""
+    _state.replica = alias
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request"""
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica()
+        # Reads inside a transaction must see its writes
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication
+        return db not in settings.DATABASE_REPLICAS['ALIASES']
+
+
+class ReplicaReadMixin:
+    """Viewset mixin reading from a replica for safe requests
+
+    The replica is chosen after authentication, so the queries
+    authenticating the request and those of pinned users go to the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        aliases = settings.DATABASE_REPLICAS['ALIASES']
+        if aliases and request.method in SAFE_METHODS and \
+                not is_pinned(request.user.pk):
+            _state.replica = random.choice(aliases)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _state.replica = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinningMiddleware:
+    """Pin users to the primary after requests that may have written"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = None
+
+        if request.method not in SAFE_METHODS and \
+                settings.DATABASE_REPLICAS['ALIASES']:
+            # DRF puts the user it authenticated on the Django request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
@@ -0,0 +1,109 @@
+"""Full-text search over post title, content and category
+
+SQLite keeps a separate FTS5 table, `core_post_fts`, whose rowid is the
+post id and which is refreshed from the Post save and delete signals.
+MySQL uses a FULLTEXT index on `core_post`, which the server maintains
+itself. Both are created by migration 0019. Other databases fall back to
+an unranked substring match of every word.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'core_post_fts'
+SEARCH_COLUMNS = ('title', 'content', 'category')
+# bm25 weights for title, content and category
+SQLITE_WEIGHTS = (4.0, 1.0, 2.0)
+
+
+def _sqlite_match(query):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_post(post, using='default'):
+    """Add or refresh the search index entry of a post"""
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content, category) '
+            f'VALUES (%s, %s, %s, %s)',
+            [post.pk, post.title, post.content, post.category]
+        )
+
+
+def unindex_post(post, using='default'):
+    """Remove a post from the search index"""
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+
+
+def rebuild_index(using='default'):
+    """Repopulate the search index from the posts table"""
+    if connections[using].vendor != 'sqlite':
+        return
+    columns = ', '.join(SEARCH_COLUMNS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM core_post'
+        )
+
+
+def search_posts(queryset, query):
+    """Filter a Post queryset to the matches for query, best first
+
+    The previous ordering of the queryset breaks ties between equally
+    ranked posts.
+    """
+    vendor = connections[queryset.db].vendor
+    ordering = queryset.query.order_by
+
+    if vendor == 'sqlite':
+        match = _sqlite_match(query)
+        if not match:
+            return queryset.none()
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        table = queryset.model._meta.db_table
+        # Join the index once; the ORM has no join to an unrelated table
+        queryset = queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = {table}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match]
+        )
+    elif vendor == 'mysql':
+        columns = ', '.join(SEARCH_COLUMNS)
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f'MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+            [query],
+            output_field=FloatField()
+        )).filter(search_rank__gt=0)
+    else:
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(reduce(operator.or_, (
+                Q(**{f'{column}__icontains': term})
+                for column in SEARCH_COLUMNS
+            )))
+        queryset = queryset.annotate(
+            search_rank=Value(0, output_field=FloatField())
+        )
+
+    return queryset.order_by('-search_rank', *ordering)
@@ -0,0 +1,166 @@
+"""Content-addressed storage for uploaded images
+
+Every image is stored once under a name derived from the SHA-256 of its
+content, e.g. `uploads/blobs/ab/cd/<digest>.jpg`, whatever name it was
+uploaded with. The same photo uploaded twice, or used both as a post image
+and an avatar, shares one file and one set of variants.
+
+Blobs are shared between rows, so deleting a row or a field never removes
+one. The collect_image_blobs command removes blobs once no field in
+core.models.IMAGE_FIELDS references them, see reference_counts().
+"""
+import hashlib
+import os
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_root(name):
+    """Return the blob name without extension or variant suffix"""
+    root, _ = os.path.splitext(name)
+    return root.split('__', 1)[0]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files by the digest of their content
+
+    Files that carry a `sha256` attribute, as set by the post upload
+    handler while the request streams in, are not read again to find their
+    name, and are not written at all when their blob already exists.
+    """
+
+    @property
+    def prefix(self):
+        return settings.IMAGE_STORAGE['PREFIX']
+
+    def blob_name(self, digest, name):
+        """Return the storage name of the blob of digest"""
+        _, ext = os.path.splitext(name)
+        return '/'.join([
+            self.prefix, digest[:2], digest[2:4], digest + ext.lower()
+        ])
+
+    def get_available_name(self, name, max_length=None):
+        # The name is replaced by the digest in _save, so it never clashes
+        return name
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None)
+        if digest is not None and self._reuse(self.blob_name(digest, name)):
+            return self.blob_name(digest, name)
+
+        temp_path, digest = self._write_temporary(content, digest)
+        blob = self.blob_name(digest, name)
+        try:
+            if self._reuse(blob):
+                return blob
+            self._move_into_place(temp_path, blob)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return blob
+
+    def save_named(self, name, content):
+        """Save content under name itself, not under its digest
+
+        For files derived from a blob, like its resized variants in
+        core.thumbnails, whose names are derived from the blob's. An
+        existing file of that name is replaced.
+        """
+        temp_path, _ = self._write_temporary(content, None)
+        try:
+            self._move_into_place(temp_path, name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return name
+
+    def _move_into_place(self, temp_path, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Atomic, so readers never see a partly written file
+        os.replace(temp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def _reuse(self, blob):
+        """Return whether blob exists, and if so restart its grace period"""
+        try:
+            # Until the new reference commits, the blob may look unused
+            os.utime(self.path(blob))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _write_temporary(self, content, digest):
+        """Copy content to a temporary file next to the blobs
+
+        The content is hashed while it is copied unless its digest is
+        already known. Return the temporary path and the digest.
+        """
+        directory = self.path(f'{self.prefix}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, uuid.uuid4().hex)
+        hasher = hashlib.sha256() if digest is None else None
+        with open(temp_path, 'wb') as f:
+            for chunk in content.chunks(CHUNK_SIZE):
+                if hasher is not None:
+                    hasher.update(chunk)
+                f.write(chunk)
+
+        return temp_path, digest or hasher.hexdigest()
+
+    def delete(self, name):
+        # Other rows may share the blob, collect_image_blobs removes it
+        if not name.startswith(self.prefix + '/'):
+            super().delete(name)
+
+    def purge(self, name):
+        """Delete the file called name, even if it is a blob"""
+        super().delete(name)
+
+    def reference_counts(self):
+        """Return a Counter of blob names referenced by image fields"""
+        from core.models import IMAGE_FIELDS
+
+        counts = Counter()
+        for model, fields in IMAGE_FIELDS.items():
+            for field in fields:
+                names = model.objects.filter(**{
+                    f'{field}__startswith': self.prefix + '/'
+                }).values_list(field, flat=True)
+                counts.update(names.iterator(chunk_size=2000))
+
+        return counts
+
+    def blobs(self):
+        """Yield (name, size, age in seconds) of every file under prefix"""
+        root = self.path(self.prefix)
+        now = time.time()
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                name = os.path.relpath(path, self.location)
+                yield (
+                    name.replace(os.sep, '/'),
+                    stat.st_size,
+                    now - stat.st_mtime,
+                )
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,121 @@
+"""Test runner with a fast password hasher and migrated database snapshots
+
+Hashing passwords with the production hashers is deliberately slow and
+most tests create users, so FastTestRunner swaps in the hashers of
+FAST_TESTS['PASSWORD_HASHERS'] for the run. Tests of the hashers
+themselves override PASSWORD_HASHERS again.
+
+Migrating an empty database takes longer than most of the suite. The
+first run saves the migrated SQLite test database to SNAPSHOT_DIR, under a
+name derived from every migration file, and later runs restore it with
+the SQLite backup API instead of migrating. Adding or editing a migration
+changes the name, so a stale snapshot is never used. Databases forked by
+--parallel workers are copies of the restored one.
+"""
+import functools
+import hashlib
+import os
+import sqlite3
+import sys
+import uuid
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def migrations_digest():
+    """Return a digest of Django's version and every migration file"""
+    digest = hashlib.sha256(django.get_version().encode())
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    for key, migration in sorted(loader.disk_migrations.items()):
+        digest.update(repr(key).encode())
+        with open(sys.modules[migration.__module__].__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def snapshot_path(connection, digest):
+    """Return the snapshot file of the test database of connection"""
+    return os.path.join(
+        settings.FAST_TESTS['SNAPSHOT_DIR'],
+        f'{connection.alias}-{digest[:16]}.sqlite3'
+    )
+
+
+def create_test_db(connection, snapshot, create_test_db, verbosity=1,
+                   autoclobber=False, serialize=True, keepdb=False):
+    """Create the test database of connection from a snapshot if there is one
+
+    Otherwise migrate it with create_test_db and save a snapshot of it.
+    """
+    if not os.path.exists(snapshot):
+        name = create_test_db(verbosity, autoclobber, serialize, keepdb)
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        # Written aside then renamed, so parallel runs never read half of it
+        partial = f'{snapshot}.{uuid.uuid4().hex}'
+        target = sqlite3.connect(partial)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        os.replace(partial, snapshot)
+        return name
+
+    creation = connection.creation
+    name = creation._get_test_db_name()
+    if verbosity >= 1:
+        creation.log('Restoring test database for alias %s from %s...' % (
+            creation._get_database_display_str(verbosity, name), snapshot
+        ))
+    creation._create_test_db(verbosity, autoclobber, keepdb)
+    connection.close()
+    settings.DATABASES[connection.alias]['NAME'] = name
+    connection.settings_dict['NAME'] = name
+    connection.ensure_connection()
+    source = sqlite3.connect(snapshot)
+    try:
+        source.backup(connection.connection)
+    finally:
+        source.close()
+    if serialize:
+        connection._test_serialized_contents = \
+            creation.serialize_db_to_string()
+    return name
+
+
+class FastTestRunner(DiscoverRunner):
+    """Run tests with fast password hashing and snapshotted databases"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._fast_settings = None
+        if settings.FAST_TESTS['ENABLED']:
+            self._fast_settings = override_settings(
+                PASSWORD_HASHERS=settings.FAST_TESTS['PASSWORD_HASHERS']
+            )
+            self._fast_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        if self._fast_settings is not None:
+            self._fast_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        if settings.FAST_TESTS['ENABLED'] and not self.keepdb:
+            digest = None
+            for connection in connections.all():
+                if connection.vendor != 'sqlite' or \
+                        connection.settings_dict['TEST']['MIRROR']:
+                    continue
+                digest = digest or migrations_digest()
+                # Shadows the method on this connection's instance only
+                connection.creation.create_test_db = functools.partial(
+                    create_test_db, connection,
+                    snapshot_path(connection, digest),
+                    connection.creation.create_test_db
+                )
+        return super().setup_databases(**kwargs)
@@ -0,0 +1,62 @@
+"""Factories building test data with bulk_create
+
+Meant for fixtures shared by the tests of a class in setUpTestData. Rows
+are inserted in one query per model, so save() methods and signals do not
+run: posts made here are missing from the search index and from the
+counters of their tags and rates.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+
+from core.models import Ingredient, Post, Tag
+
+
+def create_users(*emails, password='testpass', **fields):
+    """Create a user for each email, all with the same password"""
+    User = get_user_model()
+    encoded = make_password(password)
+    User.objects.bulk_create(
+        User(email=email, password=encoded, **fields) for email in emails
+    )
+    users = User.objects.in_bulk(emails, field_name='email')
+    return [users[email] for email in emails]
+
+
+def create_user(email='test@londonappdev.com', **fields):
+    """Create a user, see create_users"""
+    return create_users(email, **fields)[0]
+
+
+def create_posts(user, count, **fields):
+    """Create count posts of user, in insertion order"""
+    defaults = {
+        'title': 'Sample post',
+        'time_minutes': 10,
+        'price': 5.00,
+    }
+    defaults.update(fields)
+    last = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+    Post.objects.bulk_create(
+        Post(user=user, **defaults) for _ in range(count)
+    )
+    return list(Post.objects.filter(pk__gt=last).order_by('pk'))
+
+
+def _create_named(model, user, names):
+    model.objects.bulk_create(model(user=user, name=name) for name in names)
+    objects = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    return [objects[name] for name in names]
+
+
+def create_tags(user, *names):
+    """Create a tag of user for each name"""
+    return _create_named(Tag, user, names)
+
+
+def create_ingredients(user, *names):
+    """Create an ingredient of user for each name"""
+    return _create_named(Ingredient, user, names)
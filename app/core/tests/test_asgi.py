@@ -0,0 +1,222 @@
+import asyncio
+import io
+import json
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.asgi import AsgiHandler, build_environ
+from core.instrumentation import recorder
+from core.models import Ingredient, Post, Tag
+from core.tests.factories import create_user
+
+
+def asgi_request(handler, method, path, body=b'', headers=(), chunks=1,
+                 disconnect=False):
+    """Send a request to an ASGI application, return the sent messages"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + list(headers),
+        'client': ('127.0.0.1', 1234),
+        'server': ('localhost', 80),
+    }
+    size = -(-len(body) // chunks) or 1
+    messages = [
+        {
+            'type': 'http.request',
+            'body': body[start:start + size],
+            'more_body': start + size < len(body),
+        }
+        for start in range(0, max(len(body), 1), size)
+    ]
+    if disconnect:
+        messages = [{'type': 'http.disconnect'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+    return sent
+
+
+class BuildEnvironTests(SimpleTestCase):
+
+    def test_build_environ(self):
+        """Test ASGI scopes are turned into WSGI environs"""
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/api/post/tags/café',
+            'query_string': b'assigned_only=1',
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'accept', b'text/html'),
+                (b'accept', b'application/json'),
+            ],
+            'client': ('10.0.0.1', 5000),
+        }, io.BytesIO(b'{}'))
+
+        self.assertEqual(environ['PATH_INFO'], '/api/post/tags/cafÃ©')
+        self.assertEqual(environ['QUERY_STRING'], 'assigned_only=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(
+            environ['HTTP_ACCEPT'], 'text/html,application/json'
+        )
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+        # The length of a chunked body, which has no header for it
+        self.assertEqual(environ['CONTENT_LENGTH'], '2')
+
+    def test_build_environ_cookies(self):
+        """Test repeated Cookie headers are joined as one cookie string"""
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/',
+            'query_string': b'',
+            'headers': [(b'cookie', b'a=1; b=2'), (b'cookie', b'c=3')],
+        }, io.BytesIO())
+
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2; c=3')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsgiHandlerTests(TransactionTestCase):
+    """Test serving requests through ASGI
+
+    TransactionTestCase, as views run on a thread and connection of their
+    own.
+    """
+
+    def setUp(self):
+        self.handler = AsgiHandler()
+        self.user = create_user()
+        token = Token.objects.create(user=self.user)
+        self.headers = [(b'authorization', f'Token {token.key}'.encode())]
+
+    def test_healthz(self):
+        """Test a plain Django view is served"""
+        start, body = asgi_request(self.handler, 'GET', '/healthz')
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/plain'), start['headers'])
+        self.assertEqual(body['body'], b'ok')
+
+    def test_request_threads_do_not_accumulate(self):
+        """Test histograms of finished request threads are folded together"""
+        recorder.reset()
+
+        for _ in range(50):
+            asgi_request(self.handler, 'GET', '/healthz')
+        metrics = recorder.snapshot()['healthz.get']
+
+        self.assertEqual(metrics['wall'].count, 50)
+        # This thread and at most the latest request's, still shutting down
+        self.assertLessEqual(len(recorder._tables), 2)
+
+    def test_list_posts(self):
+        """Test authenticated API reads are served"""
+        Post.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+
+        start, body = asgi_request(
+            self.handler, 'GET', reverse('post:post-list'),
+            headers=self.headers
+        )
+
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(
+            [post['title'] for post in json.loads(body['body'])], ['Curry']
+        )
+
+    def test_retrieve_post(self):
+        """Test a post detail, with relations read concurrently, is served"""
+        post = Post.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=5.00
+        )
+        post.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        post.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale')
+        )
+
+        start, body = asgi_request(
+            self.handler, 'GET', reverse('post:post-detail', args=[post.id]),
+            headers=self.headers
+        )
+
+        self.assertEqual(start['status'], 200)
+        data = json.loads(body['body'])
+        self.assertEqual([tag['name'] for tag in data['tags']], ['Spicy'])
+        self.assertEqual(
+            [item['name'] for item in data['ingredients']], ['Kale']
+        )
+        self.assertEqual(data['images'], [])
+
+    def test_body_in_several_messages(self):
+        """Test a request body sent in chunks is read whole"""
+        start, body = asgi_request(
+            self.handler, 'POST', reverse('post:tag-list'),
+            body=json.dumps({'name': 'Spicy'}).encode(), chunks=3,
+            headers=self.headers + [(b'content-type', b'application/json')]
+        )
+
+        self.assertEqual(start['status'], 201)
+        self.assertTrue(Tag.objects.filter(name='Spicy').exists())
+
+    @override_settings(ASGI_MAX_BODY_SIZE=10)
+    def test_declared_body_too_large(self):
+        """Test a body declared over the limit is refused unread"""
+        start, body = asgi_request(
+            self.handler, 'POST', reverse('post:tag-list'),
+            body=b'{"name": "Spicy food"}',
+            headers=self.headers + [(b'content-length', b'22')]
+        )
+
+        self.assertEqual(start['status'], 413)
+        self.assertIn('at most 10 bytes', json.loads(body['body'])['detail'])
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(ASGI_MAX_BODY_SIZE=10)
+    def test_chunked_body_too_large(self):
+        """Test a body without a length is refused once over the limit"""
+        start, body = asgi_request(
+            self.handler, 'POST', reverse('post:tag-list'),
+            body=b'{"name": "Spicy food"}', chunks=4, headers=self.headers
+        )
+
+        self.assertEqual(start['status'], 413)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_streaming_response(self):
+        """Test streaming responses are sent chunk by chunk"""
+        Tag.objects.create(user=self.user, name='Spicy')
+
+        messages = asgi_request(
+            self.handler, 'GET', reverse('post:post-export'),
+            headers=self.headers
+        )
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertTrue(messages[1]['more_body'])
+        self.assertFalse(messages[-1].get('more_body', False))
+        content = b''.join(message['body'] for message in messages[1:])
+        self.assertIn(b'"Spicy"', content)
+
+    def test_disconnect_before_body(self):
+        """Test nothing is sent to a client that went away"""
+        messages = asgi_request(
+            self.handler, 'GET', '/healthz', disconnect=True
+        )
+
+        self.assertEqual(messages, [])
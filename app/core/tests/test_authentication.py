@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import get_user_generation, token_cache
+from core.tests.helpers import run_on_commit
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@noufal4me.com',
+            'testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_hit_cache(self):
+        """Test the token is only looked up on the first request"""
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+
+        self.assertEqual(
+            token_cache.stats(), {'hits': 1, 'misses': 1, 'size': 1}
+        )
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token evicts it from the cache"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user evicts their tokens"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_user(self):
+        """Test changing the password evicts the user's tokens"""
+        self.client.get(ME_URL)
+
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_revoked_by_another_process_rejected(self):
+        """Test a token revoked elsewhere is not served from the cache"""
+        self.client.get(ME_URL)
+        generation = get_user_generation(self.user.pk)
+        key = self.token.key
+
+        with run_on_commit():
+            self.token.delete()
+        # The entry of a process that did not see the delete
+        token_cache.set(key, self.user, self.token, generation)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core import benchmark
+from core.models import Post, PostRate, PostTag
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.volumes = benchmark.seed(scale=0.0005)
+
+    def test_seed(self):
+        """Test the data set is seeded at the requested scale"""
+        self.assertEqual(self.volumes, {'users': 5, 'posts': 50, 'rates': 500})
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(Token.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(PostTag.objects.count(), 100)
+        self.assertEqual(PostRate.objects.count(), 500)
+        self.assertEqual(
+            sum(Post.objects.values_list('rate_count', flat=True)), 500
+        )
+
+    def test_scenarios(self):
+        """Test every scenario succeeds and reports its measurements"""
+        results = benchmark.run_scenarios(requests=3, warmup=1)
+
+        self.assertEqual(set(results), set(benchmark.SCENARIOS))
+        for scenario, result in results.items():
+            self.assertEqual(result['errors'], 0, scenario)
+            self.assertGreater(result['queries']['mean'], 0, scenario)
+            self.assertLessEqual(
+                result['latency_ms']['p50'], result['latency_ms']['max']
+            )
+
+    def test_percentile(self):
+        """Test percentiles are the nearest-rank values"""
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 95), 95)
+        self.assertEqual(benchmark.percentile(values, 100), 100)
+        self.assertEqual(benchmark.percentile([7], 99), 7)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SlowClientBenchmarkTests(TransactionTestCase):
+    """Test the slow client runs, whose requests run on other threads"""
+
+    def test_run_slow_clients(self):
+        """Test both servers answer every request of a read scenario"""
+        benchmark.seed(scale=0.0005)
+
+        for server in benchmark.SERVERS:
+            result = benchmark.run_slow_clients(
+                server, 'post-feed', requests=6, clients=3, threads=2,
+                delay=0.001
+            )
+            self.assertEqual(result['errors'], 0, server)
+            self.assertEqual(result['requests'], 6)
+            self.assertGreater(result['throughput'], 0)
@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from core import cache
+from core.tests.helpers import run_on_commit
+
+
+class SizeBoundedLRUCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = cache.SizeBoundedLRUCache(
+            'test-lru', {'OPTIONS': {'MAX_SIZE': 300}}
+        )
+        self.cache.clear()
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry goes when size runs out"""
+        self.cache.set('a', 'x' * 100)
+        self.cache.set('b', 'x' * 100)
+        self.cache.get('a')
+        self.cache.set('c', 'x' * 100)
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_overwrite_keeps_size(self):
+        """Test replacing a value does not count its old size"""
+        for _ in range(10):
+            self.cache.set('a', 'x' * 100)
+        self.cache.set('b', 'x' * 100)
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+
+
+class ResponseVersionTests(TestCase):
+
+    def test_expire_bumps_version(self):
+        """Test expiring a user's responses changes their version"""
+        version = cache.get_user_version(1)
+
+        with run_on_commit():
+            cache.expire_user_responses(1)
+            # A read before the commit must not cache under a new version
+            self.assertEqual(cache.get_user_version(1), version)
+
+        self.assertNotEqual(cache.get_user_version(1), version)
+        self.assertEqual(cache.get_user_version(1), cache.get_user_version(1))
@@ -0,0 +1,99 @@
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Post, PostComment, PostRate, Tag
+
+
+class CommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@noufal4me.com',
+            'testpass'
+        )
+
+    def test_rebuild_post_counters(self):
+        """Test rebuilding rating and comment counters from their tables"""
+        post = Post.objects.create(
+            user=self.user, title='Rated', time_minutes=5, price=5.00
+        )
+        unrated = Post.objects.create(
+            user=self.user, title='Unrated', time_minutes=5, price=5.00
+        )
+        PostRate.objects.create(user=self.user, post=post, rate=2)
+        PostRate.objects.create(user=self.user, post=post, rate=5)
+        PostComment.objects.create(user=self.user, post=post, text='Yum')
+        Post.objects.update(
+            rate_sum=99, rate_count=1, avg_rate=99, comment_count=5
+        )
+
+        call_command('rebuild_post_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        unrated.refresh_from_db()
+        self.assertEqual((post.rate_sum, post.rate_count), (7, 2))
+        self.assertEqual(post.avg_rate, 3.5)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(unrated.comment_count, 0)
+        self.assertEqual((unrated.rate_sum, unrated.rate_count), (0, 0))
+        self.assertIsNone(unrated.avg_rate)
+
+    def test_import_posts(self):
+        """Test importing an NDJSON file in several batches"""
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as f:
+            f.write(
+                b'{"type": "tag", "name": "Quick"}\n'
+                b'{"type": "post", "title": "Soup", "time_minutes": 5,'
+                b' "price": "2.00", "tags": ["Quick"]}\n'
+                b'{"type": "post", "title": "Salad", "time_minutes": 5,'
+                b' "price": "3.00"}\n'
+            )
+            f.flush()
+            out = StringIO()
+            call_command(
+                'import_posts', self.user.email, f.name, batch_size=1,
+                stdout=out
+            )
+
+        self.assertIn('Imported 1 tags, 0 ingredients, 2 posts', out.getvalue())
+        self.assertEqual(Post.objects.filter(user=self.user).count(), 2)
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual(
+            list(tag.post_set.values_list('title', flat=True)), ['Soup']
+        )
+
+
+@patch('core.management.commands.wait_for_db.time.sleep')
+@patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection')
+class WaitForDbTests(SimpleTestCase):
+
+    def test_wait_for_db_ready(self, ensure_connection, sleep):
+        """Test waiting for db when db is available"""
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(ensure_connection.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_wait_for_db_backs_off(self, ensure_connection, sleep):
+        """Test the pause doubles after every failed attempt"""
+        ensure_connection.side_effect = [OperationalError] * 3 + [None]
+
+        call_command('wait_for_db', interval=0.5, stdout=StringIO())
+
+        self.assertEqual(ensure_connection.call_count, 4)
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [0.5, 1, 2])
+
+    def test_wait_for_db_times_out(self, ensure_connection, sleep):
+        """Test giving up once the database is unavailable for too long"""
+        ensure_connection.side_effect = OperationalError('refused')
+
+        with self.assertRaisesMessage(CommandError, 'refused'):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+        sleep.assert_not_called()
@@ -0,0 +1,107 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core import fanout
+from core.instrumentation import QueryLog
+from core.models import Ingredient, Post, Tag
+from core.tests.factories import create_user
+from core.routers import current_replica, use_replica
+
+
+class GatherTests(SimpleTestCase):
+
+    def test_runs_concurrently(self):
+        """Test functions run at the same time, results in order"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(value):
+            return lambda: (barrier.wait(), value)[1]
+
+        self.assertEqual(fanout.gather(wait('a'), wait('b')), ['a', 'b'])
+
+    def test_raises_errors(self):
+        """Test an exception of a function is raised by gather"""
+        def fail():
+            raise ValueError('failed')
+
+        with self.assertRaisesMessage(ValueError, 'failed'):
+            fanout.gather(lambda: 1, fail)
+
+    def test_carries_replica(self):
+        """Test functions read from the caller's replica, and only them"""
+        use_replica('replica')
+        self.addCleanup(use_replica, None)
+
+        self.assertEqual(
+            fanout.gather(current_replica, current_replica),
+            ['replica', 'replica']
+        )
+        use_replica(None)
+        self.assertEqual(fanout.gather(current_replica), [None])
+
+    def test_nested_gather_runs_inline(self):
+        """Test gather() from a gathered function runs on its thread"""
+        def nested():
+            return threading.get_ident(), fanout.gather(
+                threading.get_ident, threading.get_ident
+            )
+
+        (outer, inner), = fanout.gather(nested)
+
+        self.assertEqual(inner, [outer, outer])
+
+
+class GatherInstrumentationTests(TransactionTestCase):
+    """TransactionTestCase, as the functions run on connections of their own"""
+
+    def test_carries_execute_wrappers(self):
+        """Test the caller's execute wrappers see the functions' queries"""
+        queries = QueryLog(keep_sql=False)
+
+        with connection.execute_wrapper(queries):
+            fanout.gather(Tag.objects.count, Tag.objects.count)
+
+        self.assertEqual(queries.count, 2)
+
+    def test_prefetches_concurrently(self):
+        """Test the prefetched relations are read at the same time"""
+        user = create_user()
+        post = Post.objects.create(
+            user=user, title='Curry', time_minutes=5, price=5.00
+        )
+        post.tags.add(Tag.objects.create(user=user, name='Spicy'))
+        post.ingredients.add(Ingredient.objects.create(user=user, name='Kale'))
+        caller = threading.get_ident()
+        # Read one after the other, the first prefetch would time out
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_other_prefetch(execute, sql, params, many, context):
+            if threading.get_ident() != caller:
+                barrier.wait()
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wait_for_other_prefetch):
+            posts = list(
+                fanout.ConcurrentPrefetchQuerySet(Post)
+                .prefetch_related('tags', 'ingredients')
+            )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [tag.name for tag in posts[0].tags.all()], ['Spicy']
+            )
+            self.assertEqual(
+                [item.name for item in posts[0].ingredients.all()], ['Kale']
+            )
+
+
+class GatherTransactionTests(TestCase):
+
+    def test_runs_inline_in_transaction(self):
+        """Test functions run on the caller's thread in a transaction"""
+        with transaction.atomic():
+            results = fanout.gather(threading.get_ident, threading.get_ident)
+
+        self.assertEqual(results, [threading.get_ident()] * 2)
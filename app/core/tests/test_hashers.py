@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import HashingPoolBusy, ScryptPasswordHasher
+
+
+TOKEN_URL = reverse('user:token')
+# The production hashers, which the test runner replaces with a fast one
+PASSWORD_HASHERS = [
+    'core.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+]
+
+
+@override_settings(PASSWORD_HASHERS=PASSWORD_HASHERS)
+class PasswordHashingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'test@noufal4me.com', 'password': 'testpass'}
+
+    def test_new_passwords_use_scrypt(self):
+        """Test new users get scrypt password hashes"""
+        user = get_user_model().objects.create_user(**self.payload)
+
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password(self.payload['password']))
+
+    def test_scrypt_costs_change_triggers_update(self):
+        """Test a hash made with other costs must be updated"""
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+
+        self.assertFalse(hasher.must_update(encoded))
+        with self.settings(SCRYPT_HASHER={'N': 2 ** 12, 'R': 8, 'P': 1}):
+            self.assertTrue(hasher.must_update(encoded))
+
+    def test_login_rehashes_old_password(self):
+        """Test logging in upgrades a PBKDF2 hash to scrypt"""
+        user = get_user_model().objects.create_user(email=self.payload['email'])
+        user.password = make_password(
+            self.payload['password'], hasher='pbkdf2_sha256'
+        )
+        user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+
+    @override_settings(PASSWORD_HASHING_POOL={
+        'ENABLED': False, 'WORKERS': None, 'QUEUE_SIZE': 0,
+    })
+    def test_login_without_pool(self):
+        """Test logging in with verification on the request thread"""
+        get_user_model().objects.create_user(**self.payload)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_busy_pool_throttles_login(self):
+        """Test logins are refused when the hashing pool is saturated"""
+        get_user_model().objects.create_user(**self.payload)
+
+        with patch('core.backends.hashing_pool.run',
+                   side_effect=HashingPoolBusy):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
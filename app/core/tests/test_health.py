@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class HealthTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_healthz(self):
+        """Test liveness needs neither authentication nor the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'ok')
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz(self):
+        """Test readiness with the database and storage reachable"""
+        res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'database': 'ok', 'storage': 'ok'})
+
+    def test_readyz_database_unavailable(self):
+        """Test readiness fails when the database does not answer"""
+        with patch(
+            'core.health.connection.cursor',
+            side_effect=OperationalError('refused by 10.0.0.5')
+        ), self.assertLogs('core.health', 'ERROR') as logs:
+            res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['database'], 'error')
+        self.assertNotIn('10.0.0.5', res.content.decode())
+        self.assertIn('refused by 10.0.0.5', logs.output[0])
+        self.assertEqual(res.json()['storage'], 'ok')
+
+    def test_readyz_storage_missing(self):
+        """Test readiness fails when the media directory is missing"""
+        with override_settings(MEDIA_ROOT='/nonexistent/media'), \
+                self.assertLogs('core.health', 'ERROR') as logs:
+            res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['storage'], 'error')
+        self.assertIn('not a directory', logs.output[0])
+
+    def test_probes_only_answer_safe_methods(self):
+        """Test probes reject writes"""
+        res = self.client.post(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 405)
@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.instrumentation import Histogram, recorder
+from core.models import Post
+
+
+POSTS_URL = reverse('post:post-list')
+REPORT_URL = reverse('instrumentation')
+
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'QUERY_LOG_THRESHOLD': None,
+    'REPORT_DIR': tempfile.mkdtemp(),
+    'REPORT_INTERVAL': None,
+    'ENDPOINT': True,
+}
+
+
+class HistogramTests(TestCase):
+
+    def test_percentiles(self):
+        """Test percentiles are within a bucket width of the true value"""
+        histogram = Histogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 100000)
+        self.assertEqual(histogram.max, 100000)
+        for percent in (50, 95, 99):
+            self.assertAlmostEqual(
+                histogram.percentile(percent) / (percent * 1000), 1,
+                delta=1 / 16
+            )
+
+    def test_merge(self):
+        """Test merged histograms count the values of both"""
+        first, second = Histogram(), Histogram()
+        first.record(10)
+        second.record(1000)
+
+        first.merge(second)
+
+        self.assertEqual(first.count, 2)
+        self.assertEqual(first.total, 1010)
+        self.assertEqual(first.max, 1000)
+
+
+@override_settings(
+    INSTRUMENTATION=INSTRUMENTATION, RESPONSE_CACHE_ENABLED=False
+)
+class InstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        recorder.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user', 'testpass')
+        self.client.force_authenticate(self.user)
+        Post.objects.create(
+            user=self.user, title='Pasta', time_minutes=5, price=5.00
+        )
+
+    def test_records_view_and_action(self):
+        """Test requests are recorded under their view and action"""
+        self.client.get(POSTS_URL)
+        self.client.get(POSTS_URL)
+
+        metrics = recorder.snapshot()['PostViewSet.list']
+        self.assertEqual(metrics['wall'].count, 2)
+        self.assertGreater(metrics['queries'].max, 0)
+        self.assertGreater(metrics['serialization'].total, 0)
+        self.assertLessEqual(metrics['db'].total, metrics['wall'].total)
+
+    def test_records_token_cache_hits(self):
+        """Test token authenticated requests record token cache hits"""
+        token_cache.clear()
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        client.get(POSTS_URL)
+        client.get(POSTS_URL)
+        self.client.get(POSTS_URL)
+
+        hits = recorder.snapshot()['PostViewSet.list']['token_cache_hit']
+        self.assertEqual(hits.count, 2)
+        self.assertEqual(hits.summary()['mean'], 0.5)
+
+    def test_logs_requests_over_query_threshold(self):
+        """Test the SQL of requests over the query threshold is logged"""
+        options = dict(INSTRUMENTATION, QUERY_LOG_THRESHOLD=0)
+        with self.settings(INSTRUMENTATION=options):
+            with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+                self.client.get(POSTS_URL)
+
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_report_endpoint_admin_only(self):
+        """Test the JSON report is only served to admins"""
+        res = self.client.get(REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_report_endpoint(self):
+        """Test admins get percentiles of every endpoint"""
+        self.client.get(POSTS_URL)
+        self.user.is_staff = True
+
+        res = self.client.get(REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['PostViewSet.list']['wall']['count'], 1)
+        self.assertIn('p95', res.data['PostViewSet.list']['db'])
+
+    def test_report_endpoint_disabled(self):
+        """Test the report is not served unless enabled"""
+        self.user.is_staff = True
+        options = dict(INSTRUMENTATION, ENDPOINT=False)
+        with self.settings(INSTRUMENTATION=options):
+            res = self.client.get(REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_report_command(self):
+        """Test the command reports the histograms dumped by processes"""
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir)
+        self.client.get(POSTS_URL)
+        recorder.dump(report_dir)
+        out = StringIO()
+
+        options = dict(INSTRUMENTATION, REPORT_DIR=report_dir)
+        with self.settings(INSTRUMENTATION=options):
+            call_command('instrumentation_report', stdout=out)
+
+        self.assertIn('PostViewSet.list', out.getvalue())
+        self.assertIn('tok hit%', out.getvalue())
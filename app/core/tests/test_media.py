@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from core.media import parse_range
+
+
+SERVING = {
+    'BACKEND': 'python',
+    'ACCEL_REDIRECT_LOCATION': '/protected-media/',
+    'MAX_AGE': 3600,
+}
+
+
+class ParseRangeTests(TestCase):
+
+    def test_parse_range(self):
+        """Test byte ranges are resolved against the file size"""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+
+    def test_parse_range_whole_file(self):
+        """Test unsupported range forms fall back to the whole file"""
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('lines=1-2', 100))
+
+    def test_parse_range_unsatisfiable(self):
+        """Test ranges past the end of the file are refused"""
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+
+    def test_parse_range_empty_file(self):
+        """Test no range of an empty file can be satisfied"""
+        for header in ('bytes=-10', 'bytes=0-', 'bytes=0-9'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 0)
+
+
+@override_settings(MEDIA_SERVING=SERVING)
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        self.media_root = media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.content = bytes(range(256)) * 4
+        os.makedirs(os.path.join(media_root, 'uploads/blobs/ab/cd'))
+        self.name = 'uploads/blobs/ab/cd/abcd.jpg'
+        with open(os.path.join(media_root, self.name), 'wb') as f:
+            f.write(self.content)
+        self.url = '/media/' + self.name
+
+    def test_serve_file(self):
+        """Test a media file is served with long-lived cache headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=3600', res['Cache-Control'])
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_serve_range(self):
+        """Test a range request gets just the bytes asked for"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.content[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(res['Content-Range'], 'bytes 10-19/1024')
+
+    def test_serve_range_to_end(self):
+        """Test an open ended range is served from the file offset"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.content[1000:])
+        self.assertEqual(res['Content-Length'], '24')
+
+    def test_serve_range_unsatisfiable(self):
+        """Test a range past the end of the file is refused"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */1024')
+
+    def test_if_range_mismatch_serves_whole_file(self):
+        """Test a stale If-Range gets the whole file"""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_conditional_request(self):
+        """Test a current client copy gets 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_missing_and_outside_files(self):
+        """Test missing files and paths outside MEDIA_ROOT are not found"""
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+        self.assertEqual(
+            self.client.get('/media/../settings.py').status_code, 404
+        )
+
+    def test_x_accel_redirect(self):
+        """Test nginx is told to send the file itself"""
+        serving = dict(SERVING, BACKEND='x-accel-redirect')
+        with self.settings(MEDIA_SERVING=serving):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/protected-media/' + self.name
+        )
+
+    def test_x_sendfile(self):
+        """Test the front server gets the absolute path of the file"""
+        serving = dict(SERVING, BACKEND='x-sendfile')
+        with self.settings(MEDIA_SERVING=serving):
+            res = self.client.get(self.url)
+
+        self.assertEqual(
+            res['X-Sendfile'], os.path.join(self.media_root, self.name)
+        )
@@ -0,0 +1,41 @@
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase
+
+
+SQUASHED_MIGRATION = ('core', '0001_squashed_0014_auto_20191104_1725')
+
+
+class SchemaTests(TestCase):
+    """Test the schema built for a new database"""
+
+    def _indexes(self, table):
+        """Return the columns of every index on table"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+        return {
+            tuple(constraint['columns']): constraint['unique']
+            for constraint in constraints.values()
+            if constraint['index'] or constraint['unique']
+        }
+
+    def test_new_database_uses_squashed_migration(self):
+        """Test a new database is migrated with the squashed migration"""
+        loader = MigrationLoader(connection)
+
+        self.assertIn(SQUASHED_MIGRATION, loader.applied_migrations)
+        self.assertNotIn(('core', '0001_initial'), loader.graph.nodes)
+
+    def test_post_indexes(self):
+        """Test posts are indexed by user and by user and creation date"""
+        indexes = self._indexes('core_post')
+
+        self.assertIn(('user_id',), indexes)
+        self.assertIn(('user_id', 'creationDate', 'id'), indexes)
+
+    def test_tag_and_ingredient_indexes(self):
+        """Test tags and ingredients are uniquely indexed by user and name"""
+        for table in ('core_tag', 'core_ingredient'):
+            self.assertTrue(self._indexes(table)[('user_id', 'name')], table)
@@ -75,6 +75,55 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(post), post.title)
 
+    def test_post_rate_aggregates(self):
+        """Test rating aggregates follow rate inserts, updates and deletes"""
+        user = sample_user()
+        post = models.Post.objects.create(
+            user=user,
+            title='Steak and mushroom sauce',
+            time_minutes=5,
+            price=5.00
+        )
+        rate1 = models.PostRate.objects.create(user=user, post=post, rate=4)
+        rate2 = models.PostRate.objects.create(user=user, post=post, rate=1)
+        post.refresh_from_db()
+        self.assertEqual((post.rate_sum, post.rate_count), (5, 2))
+        self.assertEqual(post.avg_rate, 2.5)
+
+        rate2.rate = 5
+        rate2.save()
+        post.refresh_from_db()
+        self.assertEqual((post.rate_sum, post.rate_count), (9, 2))
+        self.assertEqual(post.avg_rate, 4.5)
+
+        rate1.delete()
+        models.PostRate.objects.filter(pk=rate2.pk).delete()
+        post.refresh_from_db()
+        self.assertEqual((post.rate_sum, post.rate_count), (0, 0))
+        self.assertIsNone(post.avg_rate)
+
+    def test_post_comment_count(self):
+        """Test the comment counter follows comment inserts and deletes"""
+        user = sample_user()
+        post = models.Post.objects.create(
+            user=user,
+            title='Steak and mushroom sauce',
+            time_minutes=5,
+            price=5.00
+        )
+        comment = models.PostComment.objects.create(
+            user=user, post=post, text='Lovely'
+        )
+        models.PostComment.objects.create(user=user, post=post, text='Yum')
+        comment.text = 'Edited'
+        comment.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
     @patch('uuid.uuid4')
     def test_post_file_name_uuid(self, mock_uuid):
         """Test that image is saved in the correct location"""
@@ -0,0 +1,195 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.instrumentation import recorder
+from core.pool import ConnectionPool, PoolTimeout
+from core.tests.factories import create_user
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'pool.sqlite3')
+
+    def _pool(self, **options):
+        options = dict({
+            'max_size': 2, 'max_age': 60, 'max_uses': 100, 'timeout': 1,
+        }, **options)
+        return ConnectionPool(
+            lambda: sqlite3.connect(self.path, check_same_thread=False),
+            lambda connection: connection.execute('SELECT 1'),
+            **options
+        )
+
+    def test_reuses_connections(self):
+        """Test a returned connection is handed out again"""
+        pool = self._pool()
+
+        first = pool.acquire().connection
+        pool.release(first)
+        second = pool.acquire().connection
+
+        self.assertIs(first, second)
+        self.assertEqual(pool.stats['connects'], 1)
+        self.assertEqual(pool.stats['checkouts'], 2)
+
+    def test_bounded_size_times_out(self):
+        """Test checking out past the maximum size waits, then fails"""
+        pool = self._pool(max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats['timeouts'], 1)
+
+    def test_waits_for_returned_connection(self):
+        """Test a waiting checkout gets the next returned connection"""
+        pool = self._pool(max_size=1)
+        first = pool.acquire().connection
+        release = threading.Timer(0.05, pool.release, [first])
+        release.start()
+
+        pooled = pool.acquire()
+
+        release.join()
+        self.assertIs(pooled.connection, first)
+        self.assertGreater(pooled.waited, 0)
+        self.assertEqual(pool.stats['waits'], 1)
+
+    def test_recycles_by_uses(self):
+        """Test connections are replaced after MAX_USES checkouts"""
+        pool = self._pool(max_uses=2)
+        first = pool.acquire().connection
+        pool.release(first)
+        pool.release(pool.acquire().connection)
+
+        self.assertIsNot(pool.acquire().connection, first)
+        self.assertEqual(pool.stats['recycled'], 1)
+
+    def test_recycles_by_age(self):
+        """Test connections are replaced once older than MAX_AGE"""
+        pool = self._pool(max_age=0.01)
+        first = pool.acquire().connection
+        time.sleep(0.02)
+        pool.release(first)
+
+        self.assertIsNot(pool.acquire().connection, first)
+        self.assertEqual(pool.size, 1)
+
+    def test_discards_broken_connections(self):
+        """Test a connection failing its health check is replaced"""
+        pool = self._pool()
+        first = pool.acquire().connection
+        pool.release(first)
+        first.close()
+
+        second = pool.acquire().connection
+
+        self.assertIsNot(second, first)
+        second.execute('SELECT 1')
+        self.assertEqual(pool.stats['failed_checks'], 1)
+
+    def test_checks_outside_the_lock(self):
+        """Test other threads can use the pool while a connection is pinged"""
+        unlocked = threading.Event()
+
+        def check(connection):
+            def lock():
+                with pool._condition:
+                    unlocked.set()
+            thread = threading.Thread(target=lock)
+            thread.start()
+            thread.join(1)
+
+        pool = self._pool()
+        pool.check = check
+        pool.release(pool.acquire().connection)
+
+        pool.acquire()
+
+        self.assertTrue(unlocked.is_set())
+
+    def test_close_frees_idle_places(self):
+        """Test closing the pool closes its idle connections only"""
+        pool = self._pool()
+        busy = pool.acquire().connection
+        idle = pool.acquire().connection
+        pool.release(idle)
+
+        pool.close()
+
+        self.assertEqual(pool.size, 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            idle.execute('SELECT 1')
+        busy.execute('SELECT 1')
+
+    def test_pooled_backend(self):
+        """Test the pooled backend gives connections back on close"""
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'core.db.sqlite3', 'NAME': self.path},
+        })
+        wrapper = handler['default']
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (id integer)')
+        first = wrapper.connection
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM t')
+
+        self.assertIs(wrapper.connection, first)
+        self.assertEqual(wrapper.pool.stats['connects'], 1)
+        self.assertGreaterEqual(wrapper.pool_wait, 0)
+        wrapper.close()
+        wrapper.pool.close()
+
+    def test_pooled_backend_discards_after_errors(self):
+        """Test a connection an error occurred on is not given back"""
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'core.db.sqlite3', 'NAME': self.path},
+        })
+        wrapper = handler['default']
+        with self.assertRaises(OperationalError):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT * FROM missing')
+        first = wrapper.connection
+
+        # What Django does at the end of a request, clearing errors_occurred
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIsNot(wrapper.connection, first)
+        self.assertEqual(wrapper.pool.stats['recycled'], 1)
+        wrapper.close()
+        wrapper.pool.close()
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PoolInstrumentationTests(TestCase):
+
+    def test_records_pool_wait(self):
+        """Test requests record their pool wait with a pooled backend"""
+        recorder.reset()
+        client = APIClient()
+        client.force_authenticate(create_user())
+
+        with patch.object(connection, 'pool_wait', 0.0, create=True):
+            client.get(reverse('post:tag-list'))
+
+        metrics = recorder.snapshot()['TagViewSet.list']
+        self.assertEqual(metrics['pool_wait'].count, 1)
@@ -0,0 +1,120 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Post
+from core.tests.factories import create_user
+
+
+POSTS_URL = reverse('post:post-list')
+
+DATABASE_REPLICAS = {
+    'ALIASES': ['replica'],
+    'PIN_SECONDS': 60,
+    'CACHE_ALIAS': 'default',
+}
+
+
+@override_settings(
+    DATABASE_REPLICAS=DATABASE_REPLICAS, RESPONSE_CACHE_ENABLED=False
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test reads with a replica that never catches up with the primary
+
+    TransactionTestCase, as reads inside a transaction stay on the primary.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # The replica is a copy of the primary as it is now
+        path = os.path.join(directory, 'replica.sqlite3')
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': path,
+        }
+        connections.ensure_defaults('replica')
+        connections.prepare_test_settings('replica')
+        self.addCleanup(self._remove_replica)
+        cache.clear()
+
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+
+    def _create_post(self, **params):
+        payload = {'title': 'Curry', 'time_minutes': 30, 'price': '5.00'}
+        payload.update(params)
+        return self.client.post(POSTS_URL, payload)
+
+    def test_safe_requests_read_from_replica(self):
+        """Test lists are read from the replica"""
+        Post.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price=5.00
+        )
+
+        res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_writes_pin_user_to_primary(self):
+        """Test users read their own writes from the primary"""
+        res = self._create_post()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(POSTS_URL)
+
+        self.assertEqual([post['title'] for post in res.data], ['Curry'])
+
+    def test_other_users_read_from_replica(self):
+        """Test a write only pins the user who made it"""
+        self._create_post()
+        other = create_user('other@example.com')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(POSTS_URL)
+
+        self.assertTrue(routers.is_pinned(self.user.pk))
+        self.assertFalse(routers.is_pinned(other.pk))
+        self.assertEqual(res.data, [])
+
+    def test_pin_expires(self):
+        """Test reads go back to the replica once the pin expires"""
+        options = dict(DATABASE_REPLICAS, PIN_SECONDS=0)
+        with self.settings(DATABASE_REPLICAS=options):
+            self._create_post()
+
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_router(self):
+        """Test writes and reads in transactions go to the primary"""
+        router = routers.ReplicaRouter()
+        routers._state.replica = 'replica'
+        self.addCleanup(setattr, routers._state, 'replica', None)
+
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'core'))
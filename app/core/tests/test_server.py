@@ -0,0 +1,102 @@
+import importlib
+import os
+from unittest.mock import mock_open, patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from letsfindme_project import gunicorn_config
+
+
+class GunicornConfigTests(SimpleTestCase):
+
+    def _cgroup(self, files):
+        def open_file(path):
+            if path not in files:
+                raise FileNotFoundError(path)
+            return mock_open(read_data=files[path])()
+        return patch('builtins.open', open_file)
+
+    def test_cpu_quota_v2(self):
+        """Test reading a cgroup v2 quota"""
+        with self._cgroup({'/sys/fs/cgroup/cpu.max': '150000 100000\n'}):
+            self.assertEqual(gunicorn_config.cgroup_cpu_quota(), 1.5)
+
+    def test_cpu_quota_v1(self):
+        """Test reading a cgroup v1 quota"""
+        with self._cgroup({
+            '/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '200000\n',
+            '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000\n',
+        }):
+            self.assertEqual(gunicorn_config.cgroup_cpu_quota(), 2)
+
+    def test_cpu_quota_unlimited(self):
+        """Test an unlimited or missing quota is ignored"""
+        with self._cgroup({'/sys/fs/cgroup/cpu.max': 'max 100000\n'}):
+            self.assertIsNone(gunicorn_config.cgroup_cpu_quota())
+        with self._cgroup({}):
+            self.assertIsNone(gunicorn_config.cgroup_cpu_quota())
+
+    @patch('os.sched_getaffinity', return_value=set(range(8)), create=True)
+    def test_available_cpus_bounded_by_quota(self, sched_getaffinity):
+        """Test workers follow the container quota, not the host CPUs"""
+        quota = patch.object(gunicorn_config, 'cgroup_cpu_quota')
+        with quota as cgroup_cpu_quota:
+            cgroup_cpu_quota.return_value = 1.5
+            self.assertEqual(gunicorn_config.available_cpus(), 2)
+            cgroup_cpu_quota.return_value = None
+            self.assertEqual(gunicorn_config.available_cpus(), 8)
+
+    def test_environment_overrides(self):
+        """Test the worker counts can be set from the environment"""
+        environ = {'WEB_CONCURRENCY': '3', 'GUNICORN_MAX_REQUESTS': '500'}
+        with patch.dict(os.environ, environ):
+            config = importlib.reload(gunicorn_config)
+        self.addCleanup(importlib.reload, gunicorn_config)
+
+        self.assertEqual(config.workers, 3)
+        self.assertEqual(config.max_requests, 500)
+        self.assertEqual(config.max_requests_jitter, 50)
+        self.assertTrue(config.preload_app)
+
+
+class ProductionSettingsTests(SimpleTestCase):
+
+    def test_production_settings(self):
+        """Test production settings turn DEBUG off and use pooled MySQL"""
+        settings = self._load({'DB_HOST': 'db', 'DB_POOL_SIZE': '8'})
+
+        self.assertFalse(settings.DEBUG)
+        self.assertEqual(settings.SECRET_KEY, 'production-key')
+        database = settings.DATABASES['default']
+        self.assertEqual(database['ENGINE'], 'core.db.mysql')
+        self.assertEqual(database['POOL']['MAX_SIZE'], 8)
+
+    def test_production_caches_are_shared(self):
+        """Test production caches live in memcached, not in each process"""
+        settings = self._load()
+
+        for alias in ('default', 'responses'):
+            self.assertIn('memcached', settings.CACHES[alias]['BACKEND'])
+            self.assertEqual(
+                settings.CACHES[alias]['LOCATION'],
+                ['cache-1:11211', 'cache-2:11211']
+            )
+
+    def test_production_settings_required(self):
+        """Test production refuses to start without a secret or cache"""
+        for name in ('DJANGO_SECRET_KEY', 'MEMCACHED_LOCATION'):
+            with self.subTest(name), \
+                    self.assertRaisesMessage(ImproperlyConfigured, name):
+                self._load({name: ''})
+
+    def _load(self, environ=()):
+        environ = dict({
+            'DJANGO_SECRET_KEY': 'production-key',
+            'MEMCACHED_LOCATION': 'cache-1:11211,cache-2:11211',
+        }, **dict(environ))
+        with patch.dict(os.environ, environ):
+            settings = importlib.import_module(
+                'letsfindme_project.production_settings'
+            )
+            return importlib.reload(settings)
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import thumbnails
+from core.models import Image, Post
+from core.storage import image_storage
+
+
+def sample_post(user, **params):
+    """Create and return a sample post"""
+    defaults = {'title': 'Pasta', 'time_minutes': 5, 'price': 5.00}
+    defaults.update(params)
+    return Post.objects.create(user=user, **defaults)
+
+
+def collect(**options):
+    """Run collect_image_blobs and return its output"""
+    out = StringIO()
+    call_command('collect_image_blobs', stdout=out, **options)
+    return out.getvalue()
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        # A fresh media root per test, as blobs are shared by content
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user('user', 'testpass')
+        self.post = sample_post(self.user)
+
+    def test_file_named_by_digest(self):
+        """Test a saved file is named after the SHA-256 of its content"""
+        digest = hashlib.sha256(b'photo').hexdigest()
+
+        name = image_storage.save('uploads/post/a.JPG', ContentFile(b'photo'))
+
+        self.assertEqual(
+            name, f'uploads/blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        with image_storage.open(name) as f:
+            self.assertEqual(f.read(), b'photo')
+
+    def test_same_content_stored_once(self):
+        """Test saving identical content from different fields shares a blob"""
+        image = Image(post=self.post)
+        image.imageRef.save('a.jpg', ContentFile(b'photo'))
+        self.user.avatar.save('b.jpg', ContentFile(b'photo'))
+
+        self.assertEqual(image.imageRef.name, self.user.avatar.name)
+        files = [name for name, _, _ in image_storage.blobs()]
+        self.assertEqual(files, [image.imageRef.name])
+
+    def test_known_digest_skips_write(self):
+        """Test content with a digest is not read when its blob exists"""
+        name = image_storage.save('a.jpg', ContentFile(b'photo'))
+        content = ContentFile(b'')
+        content.sha256 = hashlib.sha256(b'photo').hexdigest()
+
+        self.assertEqual(image_storage.save('b.jpg', content), name)
+        with image_storage.open(name) as f:
+            self.assertEqual(f.read(), b'photo')
+
+    def test_save_named_keeps_name(self):
+        """Test files derived from a blob can be saved under a fixed name"""
+        name = 'uploads/blobs/ab/cd/abcd__thumb.jpg'
+
+        saved = image_storage.save_named(name, ContentFile(b'a'))
+        image_storage.save_named(name, ContentFile(b'b'))
+
+        self.assertEqual(saved, name)
+        with image_storage.open(name) as f:
+            self.assertEqual(f.read(), b'b')
+
+    def test_delete_keeps_blob(self):
+        """Test deleting a field leaves the shared blob to the collector"""
+        image = Image.objects.create(post=self.post)
+        image.imageRef.save('a.jpg', ContentFile(b'photo'))
+        name = image.imageRef.name
+
+        image.imageRef.delete()
+
+        self.assertTrue(image_storage.exists(name))
+
+    def test_reference_counts(self):
+        """Test references are counted across every image field"""
+        name = image_storage.save('a.jpg', ContentFile(b'photo'))
+        Image.objects.create(post=self.post, imageRef=name)
+        Image.objects.create(post=self.post, imageRef=name)
+        self.user.avatar = name
+        self.user.save()
+
+        self.assertEqual(image_storage.reference_counts()[name], 3)
+
+    def test_collect_unreferenced_blobs(self):
+        """Test the collector deletes unreferenced blobs and their variants"""
+        kept = image_storage.save('a.jpg', ContentFile(b'kept'))
+        Image.objects.create(post=self.post, imageRef=kept)
+        orphan = image_storage.save('b.jpg', ContentFile(b'orphan'))
+        variant = thumbnails.variant_name(orphan, 'thumb', 'webp')
+        with open(image_storage.path(variant), 'wb') as f:
+            f.write(b'thumb')
+
+        out = collect(grace_period=0)
+
+        self.assertIn('Deleted 2 unreferenced files', out)
+        self.assertTrue(image_storage.exists(kept))
+        self.assertFalse(image_storage.exists(orphan))
+        self.assertFalse(image_storage.exists(variant))
+
+    def test_collect_keeps_recent_blobs(self):
+        """Test blobs within the grace period survive collection"""
+        name = image_storage.save('a.jpg', ContentFile(b'photo'))
+
+        collect(grace_period=3600)
+
+        self.assertTrue(image_storage.exists(name))
+
+    def test_collect_dry_run(self):
+        """Test a dry run lists unreferenced blobs without deleting them"""
+        name = image_storage.save('a.jpg', ContentFile(b'photo'))
+        old = os.path.getmtime(image_storage.path(name)) - 7200
+        os.utime(image_storage.path(name), (old, old))
+
+        out = collect(grace_period=3600, dry_run=True)
+
+        self.assertIn(name, out)
+        self.assertTrue(image_storage.exists(name))
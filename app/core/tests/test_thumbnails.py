@@ -0,0 +1,106 @@
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image as PILImage
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import thumbnails
+from core.models import Image, Post
+from core.storage import image_storage
+
+
+def sample_image_name(size=(1000, 500)):
+    """Store a JPEG of the given size and return its storage name"""
+    buffer = io.BytesIO()
+    PILImage.new('RGB', size).save(buffer, format='JPEG')
+    return image_storage.save(
+        'uploads/post/sample.jpg', ContentFile(buffer.getvalue())
+    )
+
+
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        # Identical images share a blob, so each test gets its own media
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_generate_variants(self):
+        """Test every size is made in JPEG and WebP, fitted to its box"""
+        name = sample_image_name()
+
+        created = thumbnails.generate_variants(name, image_storage)
+
+        self.assertEqual(len(created), 4)
+        thumb = thumbnails.variant_name(name, 'thumb', 'webp')
+        with image_storage.open(thumb) as f:
+            image = PILImage.open(f)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (200, 100))
+
+    def test_generate_variants_idempotent(self):
+        """Test generating again leaves existing variants alone"""
+        name = sample_image_name()
+        thumbnails.generate_variants(name, image_storage)
+
+        self.assertEqual(thumbnails.generate_variants(name, image_storage), [])
+
+    def test_variants_kept_with_original(self):
+        """Test variants are read and written in the original's storage"""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        buffer = io.BytesIO()
+        PILImage.new('RGB', (10, 10)).save(buffer, format='JPEG')
+        name = storage.save('elsewhere.jpg', ContentFile(buffer.getvalue()))
+
+        thumbnails.generate_variants(name, storage)
+
+        thumb = thumbnails.variant_name(name, 'thumb', 'jpeg')
+        self.assertTrue(storage.exists(thumb))
+        self.assertFalse(default_storage.exists(thumb))
+
+    def test_variant_urls_only_existing(self):
+        """Test no URL is given for variants not made yet"""
+        name = sample_image_name()
+        self.assertEqual(thumbnails.variant_urls(name, image_storage), {})
+
+        thumbnails.generate_variants(name, image_storage)
+
+        urls = thumbnails.variant_urls(name, image_storage)
+        self.assertEqual(set(urls['thumb']), {'jpeg', 'webp'})
+
+    def test_saving_image_schedules_variants(self):
+        """Test saving an image row schedules its variants"""
+        user = get_user_model().objects.create_user('user', 'testpass')
+        post = Post.objects.create(
+            user=user, title='Pasta', time_minutes=5, price=5.00
+        )
+
+        with patch('core.thumbnails.schedule_variants') as schedule:
+            Image.objects.create(post=post, imageRef='uploads/post/a.jpg')
+
+        schedule.assert_called_once_with('uploads/post/a.jpg', image_storage)
+
+    def test_backfill_command(self):
+        """Test the command creates variants for existing uploads"""
+        user = get_user_model().objects.create_user('user', 'testpass')
+        post = Post.objects.create(
+            user=user, title='Pasta', time_minutes=5, price=5.00
+        )
+        image = Image.objects.create(post=post, imageRef=sample_image_name())
+
+        call_command('generate_image_variants', stdout=io.StringIO())
+
+        name = thumbnails.variant_name(image.imageRef.name, 'medium', 'jpeg')
+        self.assertTrue(image_storage.exists(name))
@@ -0,0 +1,124 @@
+"""Resized JPEG and WebP variants of uploaded images
+
+Every variant has a fixed name derived from the original, e.g.
+`uploads/blobs/ab/cd/<digest>__thumb.webp`, so generating them again for
+a file is a no-op and URLs can be built without touching storage. Variants
+are made in a background thread pool once the upload is committed, so
+requests never wait for Pillow. Variants are kept in the storage of the
+field holding the original, so every function takes that storage.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': 'JPEG', 'webp': 'WEBP'}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Striped locks keep two workers from generating the same file at once
+_name_locks = [threading.Lock() for _ in range(64)]
+
+
+def variant_name(name, variant, fmt):
+    """Return the storage name of a variant of the image called name"""
+    root, _ = os.path.splitext(name)
+    return f'{root}__{variant}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def variant_urls(name, storage):
+    """Return {variant: {format: url}} for the image called name
+
+    Only variants that exist are listed, so none while they are still
+    being made.
+    """
+    if not name:
+        return {}
+    urls = {}
+    for variant in settings.IMAGE_VARIANTS['SIZES']:
+        for fmt in FORMATS:
+            stored_name = variant_name(name, variant, fmt)
+            if storage.exists(stored_name):
+                urls.setdefault(variant, {})[fmt] = storage.url(stored_name)
+    return urls
+
+
+def generate_variants(name, storage):
+    """Create the missing variants of the image called name
+
+    Return the names of the variants that were created.
+    """
+    created = []
+    with _name_locks[hash(name) % len(_name_locks)]:
+        missing = [
+            (variant, size, fmt)
+            for variant, size in settings.IMAGE_VARIANTS['SIZES'].items()
+            for fmt in FORMATS
+            if not storage.exists(variant_name(name, variant, fmt))
+        ]
+        if not missing:
+            return created
+
+        with storage.open(name) as original:
+            image = Image.open(original)
+            image.load()
+        # Content-addressed storages would name variants by their digest
+        save = getattr(storage, 'save_named', storage.save)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+
+        for variant, size, fmt in missing:
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            buffer = io.BytesIO()
+            resized.save(
+                buffer, FORMATS[fmt],
+                quality=settings.IMAGE_VARIANTS['QUALITY']
+            )
+            created.append(save(
+                variant_name(name, variant, fmt),
+                ContentFile(buffer.getvalue())
+            ))
+
+    return created
+
+
+def _generate_in_background(name, storage):
+    try:
+        generate_variants(name, storage)
+    except Exception:
+        logger.exception('Could not generate variants of %s', name)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANTS['WORKERS'],
+                thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def schedule_variants(name, storage):
+    """Generate the variants of name in the background after commit"""
+    if not name:
+        return
+    if not settings.IMAGE_VARIANTS['ASYNC']:
+        transaction.on_commit(lambda: generate_variants(name, storage))
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_generate_in_background, name, storage)
+    )
@@ -0,0 +1,14 @@
+"""
+ASGI config for letsfindme_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own, see core.asgi.
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'letsfindme_project.settings')
+
+application = get_asgi_application()
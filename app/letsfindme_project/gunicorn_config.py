@@ -0,0 +1,106 @@
+"""Gunicorn configuration for production servers
+
+    gunicorn -c python:letsfindme_project.gunicorn_config
+
+Serves letsfindme_project.wsgi with letsfindme_project.production_settings,
+unless DJANGO_SETTINGS_MODULE names other settings.
+
+Each of WORKERS processes runs THREADS threads. Requests mostly wait on the
+database, so one process per CPU, plus one, keeps the CPUs busy while its
+threads cover the waits. Keep the POOL MAX_SIZE of the database at least
+THREADS. Workers are replaced after about MAX_REQUESTS requests, which
+bounds the memory a leak or a fragmented heap can take.
+
+With GUNICORN_ASGI=1, uvicorn workers serve letsfindme_project.asgi
+instead, see core.asgi. Requests then only hold a thread while the view
+runs, not while the client sends the request or reads the response.
+
+WEB_CONCURRENCY and the GUNICORN_* environment variables override the
+defaults below, and command line options override both.
+"""
+import math
+import os
+
+
+os.environ.setdefault(
+    'DJANGO_SETTINGS_MODULE', 'letsfindme_project.production_settings'
+)
+
+# cgroup v2, then v1, CPU quota files of the container
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_CFS_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_CFS_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().split()
+
+
+def cgroup_cpu_quota():
+    """Return the CPUs the container's cgroup quota allows, or None"""
+    try:
+        quota, period = _read(CGROUP_CPU_MAX)
+    except (OSError, ValueError):
+        try:
+            quota, = _read(CGROUP_CFS_QUOTA)
+            period, = _read(CGROUP_CFS_PERIOD)
+        except (OSError, ValueError):
+            return None
+    if quota in ('max', '-1'):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus():
+    """Return the number of CPUs this process can use"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def _env(name, default):
+    return int(os.environ.get(name, default))
+
+
+CPUS = available_cpus()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080')
+
+if os.environ.get('GUNICORN_ASGI') == '1':
+    wsgi_app = 'letsfindme_project.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'letsfindme_project.wsgi:application'
+    worker_class = 'gthread'
+
+workers = _env('WEB_CONCURRENCY', CPUS + 1)
+threads = _env('GUNICORN_THREADS', 4)
+
+# Restart workers at different times, not all at once
+max_requests = _env('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+# Import Django and the project once in the master; workers share its pages
+preload_app = True
+
+timeout = _env('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env('GUNICORN_KEEPALIVE', 5)
+
+# Worker heartbeats on a container's overlay file system can block
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Connections opened while preloading would be shared by every worker
+    from django.db import connections
+    connections.close_all()
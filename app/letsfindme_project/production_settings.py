@@ -0,0 +1,101 @@
+"""
+Django settings for production servers, see
+letsfindme_project.gunicorn_config.
+
+Everything not set here comes from letsfindme_project.settings. Secrets,
+hosts, the database and the cache are read from the environment, and
+settings that production cannot do without fail at startup when unset.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from letsfindme_project.settings import *  # noqa: F401,F403
+
+
+# With DEBUG, Django keeps every query of a request in connection.queries
+# and answers errors with tracebacks
+DEBUG = False
+
+# The development key is committed to the repository
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY')
+
+if os.environ.get('DJANGO_ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
+
+
+# MySQL through the pooled backend, see core.pool, once DB_HOST is set.
+# Every worker thread holds a connection while it handles a request, so
+# DB_POOL_SIZE should be at least the gunicorn THREADS.
+if os.environ.get('DB_HOST'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db.mysql',
+            'HOST': os.environ['DB_HOST'],
+            'PORT': os.environ.get('DB_PORT', ''),
+            'NAME': os.environ.get('DB_NAME'),
+            'USER': os.environ.get('DB_USER'),
+            'PASSWORD': os.environ.get('DB_PASS'),
+            'POOL': {
+                'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+                'MAX_AGE': 300,
+                'MAX_USES': 1000,
+                'TIMEOUT': 10,
+            },
+        }
+    }
+
+
+# Memcached servers shared by every worker process, as host:port separated
+# by commas. Response cache versions, see core.cache, replica pins, see
+# core.routers, and token revocations, see core.authentication, only hold
+# when all processes see the same entries, which local memory caches of
+# each process don't.
+if not os.environ.get('MEMCACHED_LOCATION'):
+    raise ImproperlyConfigured('Set MEMCACHED_LOCATION')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['MEMCACHED_LOCATION'].split(','),
+        'KEY_PREFIX': 'default',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['MEMCACHED_LOCATION'].split(','),
+        'KEY_PREFIX': 'responses',
+    },
+}
+
+
+# Set MEDIA_SERVING_BACKEND to x-accel-redirect or x-sendfile to let the
+# front server send media files, see core.media
+MEDIA_SERVING = dict(
+    MEDIA_SERVING,  # noqa: F405
+    BACKEND=os.environ.get('MEDIA_SERVING_BACKEND', 'python'),
+)
+
+
+# Log to the console, gunicorn collects it. SQL is only
+# logged by django.db.backends at DEBUG level, keep it above.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'django.db.backends': {
+            'level': 'INFO',
+        },
+    },
+}
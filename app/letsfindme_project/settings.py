@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,11 +47,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -87,16 +90,101 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# The core.db backends take connections from a pool of at most MAX_SIZE per
+# process, see core.pool. Connections are pinged when checked out and
+# replaced after MAX_AGE seconds or MAX_USES checkouts; a request waits up
+# to TIMEOUT seconds when all are busy. Keep CONN_MAX_AGE at 0 with them.
 # DATABASES = {
 #     'default': {
-#         'ENGINE': 'django.db.backends.mysql',
+#         'ENGINE': 'core.db.mysql',
 #         'HOST': os.environ.get('DB_HOST'),
 #         'NAME': os.environ.get('DB_NAME'),
 #         'USER': os.environ.get('DB_USER'),
 #         'PASSWORD': os.environ.get('DB_PASS'),
+#         'POOL': {
+#             'MAX_SIZE': 10,
+#             'MAX_AGE': 300,
+#             'MAX_USES': 1000,
+#             'TIMEOUT': 10,
+#         },
 #     }
 # }
 
+# Read replicas, see core.routers. Add each replica to DATABASES, with
+# 'TEST': {'MIRROR': 'default'}, and list its alias in ALIASES. Safe
+# requests to the post, tag and ingredient endpoints then read from one of
+# them, except for users who made a write in the last PIN_SECONDS. Pins
+# are kept in the CACHE_ALIAS cache, which should be shared by all servers.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'PIN_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'core.cache.SizeBoundedLRUCache',
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+}
+
+# Per-user cache of read-only API responses, see core.cache
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# In-process token lookup cache, see core.authentication. Revocations
+# reach other processes through the CACHE_ALIAS cache when it is shared,
+# else TIMEOUT, in seconds, bounds how long they may accept a revoked token.
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 60,
+    'CACHE_ALIAS': 'default',
+}
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/2.2/topics/auth/passwords/
+# The first hasher hashes new passwords; the others only verify existing
+# hashes, which are upgraded to the first one on the next login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Raising any of these rehashes stored passwords on the next login
+SCRYPT_HASHER = {
+    'N': 2 ** 14,
+    'R': 8,
+    'P': 1,
+}
+
+AUTHENTICATION_BACKENDS = ['core.backends.PooledModelBackend']
+
+# Verify login passwords in a bounded worker pool, see core.hashers.
+# WORKERS defaults to half the CPUs; logins beyond WORKERS + QUEUE_SIZE
+# in flight are refused with 429 instead of queueing.
+PASSWORD_HASHING_POOL = {
+    'ENABLED': True,
+    'WORKERS': None,
+    'QUEUE_SIZE': 16,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,4 +226,88 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+
+# How files under MEDIA_URL are served, see core.media. 'python' sends them
+# from the worker; 'x-sendfile' (Apache, lighttpd) and 'x-accel-redirect'
+# (nginx) hand the transfer to the front server. For nginx,
+# ACCEL_REDIRECT_LOCATION must be an internal location aliased to
+# MEDIA_ROOT. Uploaded files never change, so clients keep them MAX_AGE
+# seconds.
+MEDIA_SERVING = {
+    'BACKEND': 'python',
+    'ACCEL_REDIRECT_LOCATION': '/protected-media/',
+    'MAX_AGE': 365 * 24 * 60 * 60,
+}
+AUTH_USER_MODEL = 'core.User'
+
+# Uploaded images are stored once per content under PREFIX, see
+# core.storage. collect_image_blobs keeps unreferenced blobs younger than
+# GC_GRACE_PERIOD seconds, as the upload using them may not have committed.
+IMAGE_STORAGE = {
+    'PREFIX': 'uploads/blobs',
+    'GC_GRACE_PERIOD': 24 * 60 * 60,
+}
+
+# Threads reading independent data of a request concurrently, see
+# core.fanout. Each holds a database connection while it reads.
+FANOUT = {
+    'WORKERS': 8,
+}
+
+# Resized variants made for every uploaded image, see core.thumbnails.
+# SIZES maps a variant name to the box the image is fitted into. With
+# ASYNC they are made by a pool of WORKERS threads, otherwise inline once
+# the upload transaction commits.
+IMAGE_VARIANTS = {
+    'SIZES': {
+        'thumb': (200, 200),
+        'medium': (800, 800),
+    },
+    'QUALITY': 80,
+    'ASYNC': True,
+    'WORKERS': 2,
+}
+
+# Limits of a single post image upload request, see post.uploads
+POST_IMAGE_UPLOAD = {
+    'MAX_FILES': 50,
+    'MAX_FILE_SIZE': 10 * 1024 * 1024,
+    'MAX_REQUEST_SIZE': 200 * 1024 * 1024,
+}
+
+# Longest line of an NDJSON import in bytes, see post.ndjson. Lines are
+# read one at a time, so this bounds the memory an import takes.
+NDJSON_MAX_LINE_SIZE = 1024 * 1024
+
+# Largest request body served over ASGI, see core.asgi. Bodies are read
+# before Django's limits apply, so it has to allow the largest upload.
+ASGI_MAX_BODY_SIZE = POST_IMAGE_UPLOAD['MAX_REQUEST_SIZE']
+
+# Per endpoint latency and query histograms, see core.instrumentation.
+# Every process writes its histograms to REPORT_DIR at most every
+# REPORT_INTERVAL seconds for the instrumentation_report command. Requests
+# making more than QUERY_LOG_THRESHOLD queries are logged with their SQL.
+# With ENDPOINT, admins can also read the report at api/instrumentation/.
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'QUERY_LOG_THRESHOLD': 50,
+    'REPORT_DIR': os.path.join(
+        tempfile.gettempdir(), 'letsfindme-instrumentation'
+    ),
+    'REPORT_INTERVAL': 10,
+    'ENDPOINT': False,
+}
+
+# Test runner, see core.test_runner. With FAST_TESTS ENABLED, tests hash
+# passwords with PASSWORD_HASHERS and restore the migrated test database
+# from a snapshot in SNAPSHOT_DIR instead of migrating it on every run.
+# Set the FAST_TESTS environment variable to 0 to test the real setup.
+TEST_RUNNER = 'core.test_runner.FastTestRunner'
+
+FAST_TESTS = {
+    'ENABLED': os.environ.get('FAST_TESTS', '1') != '0',
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+    'SNAPSHOT_DIR': os.path.join(
+        tempfile.gettempdir(), 'letsfindme-test-databases'
+    ),
+}
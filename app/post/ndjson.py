@@ -0,0 +1,222 @@
+"""Newline delimited JSON export and import of a user's posts
+
+Each line is one record:
+
+    {"type": "tag", "name": "Vegan"}
+    {"type": "ingredient", "name": "Kale"}
+    {"type": "post", "title": "...", "tags": ["Vegan"], "images": [...]}
+
+Posts name their tags and ingredients, so an export imports into another
+account as is. Image URLs are exported for reference but not imported, as
+the service never fetches remote files.
+
+Both directions work a chunk at a time, so memory stays flat however many
+posts a user has. Imported lines are at most NDJSON_MAX_LINE_SIZE bytes;
+a longer one ends the import with a 400, keeping the batches before it.
+"""
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+from core.cache import expire_user_responses
+from core.models import Ingredient, Post, PostIngredient, PostTag, Tag
+from post import serializers
+
+
+CHUNK_SIZE = 500
+BATCH_SIZE = 500
+MAX_ERRORS = 100
+
+MEDIA_TYPE = 'application/x-ndjson'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render data as a single NDJSON line, used for error responses"""
+    media_type = MEDIA_TYPE
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() + b'\n'
+
+
+class NDJSONParser(BaseParser):
+    """Parse NDJSON lazily, request.data yields the raw lines"""
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return read_lines(stream, settings.NDJSON_MAX_LINE_SIZE)
+
+
+def read_lines(stream, limit):
+    """Yield the lines of stream, raise ParseError at one over limit bytes
+
+    The newline is not counted. Only limit + 1 bytes are ever buffered.
+    """
+    lines = iter(lambda: stream.readline(limit + 1), b'')
+    for number, line in enumerate(lines, 1):
+        if len(line) > limit and not line.endswith(b'\n'):
+            raise ParseError(f'Line {number} is longer than {limit} bytes')
+        yield line
+
+
+def _line(record):
+    return json.dumps(record, separators=(',', ':')).encode() + b'\n'
+
+
+def _post_record(post, build_url):
+    return {
+        'type': 'post',
+        'title': post.title,
+        'time_minutes': post.time_minutes,
+        'price': str(post.price),
+        'link': post.link,
+        'category': post.category,
+        'content': post.content,
+        'created': post.creationDate.isoformat(),
+        'tags': [tag.name for tag in post.tags.all()],
+        'ingredients': [
+            ingredient.name for ingredient in post.ingredients.all()
+        ],
+        'image': build_url(post.imageUrl.url) if post.imageUrl else None,
+        'images': [
+            build_url(image.imageRef.url)
+            for image in post.images.all() if image.imageRef
+        ],
+    }
+
+
+def export_records(user, build_url=str, chunk_size=CHUNK_SIZE):
+    """Yield the NDJSON lines of every tag, ingredient and post of user"""
+    for record_type, model in (('tag', Tag), ('ingredient', Ingredient)):
+        names = model.objects.filter(user=user).order_by('id').values_list(
+            'name', flat=True
+        )
+        for name in names.iterator(chunk_size=chunk_size):
+            yield _line({'type': record_type, 'name': name})
+
+    # iterator() ignores prefetch_related, so prefetch chunk by chunk
+    posts = Post.objects.filter(user=user).order_by('id').iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(posts, chunk_size))
+        if not chunk:
+            break
+        prefetch_related_objects(chunk, 'tags', 'ingredients', 'images')
+        for post in chunk:
+            yield _line(_post_record(post, build_url))
+
+
+def _ensure_names(serializer_class, user, names):
+    """Return {name: id} for names, creating the ones user lacks"""
+    names = sorted(names)
+    rows = serializer_class(many=True).create(
+        [{'user': user, 'name': name} for name in names]
+    )
+    return {name: row.id for name, row in zip(names, rows)}
+
+
+def _write_batch(user, batch, imported):
+    tag_names = set()
+    ingredient_names = set()
+    for record_type, attrs in batch:
+        if record_type == 'tag':
+            tag_names.add(attrs['name'])
+        elif record_type == 'ingredient':
+            ingredient_names.add(attrs['name'])
+        else:
+            tag_names.update(attrs['tags'])
+            ingredient_names.update(attrs['ingredients'])
+
+    with transaction.atomic():
+        tag_ids = _ensure_names(serializers.TagSerializer, user, tag_names)
+        ingredient_ids = _ensure_names(
+            serializers.IngredientSerializer, user, ingredient_names
+        )
+
+        post_tags = []
+        post_ingredients = []
+        for record_type, attrs in batch:
+            imported[record_type] += 1
+            if record_type != 'post':
+                continue
+            tags = attrs.pop('tags')
+            ingredients = attrs.pop('ingredients')
+            # Saved one by one, as only PostgreSQL returns ids from
+            # bulk_create, and so that search indexing signals run
+            post = Post.objects.create(user=user, **attrs)
+            post_tags += [
+                PostTag(post=post, tag_id=tag_ids[name])
+                for name in set(tags)
+            ]
+            post_ingredients += [
+                PostIngredient(
+                    post=post, ingredient_id=ingredient_ids[name]
+                )
+                for name in set(ingredients)
+            ]
+        PostTag.objects.bulk_create(post_tags)
+        PostIngredient.objects.bulk_create(post_ingredients)
+
+
+def import_records(user, lines, batch_size=BATCH_SIZE):
+    """Import NDJSON lines into the account of user
+
+    Valid records are written batch_size at a time, each batch in its own
+    transaction. Invalid lines are skipped and reported with their line
+    number. Return the number of records imported by type and the errors.
+    """
+    record_serializers = {
+        'tag': serializers.TagSerializer,
+        'ingredient': serializers.IngredientSerializer,
+        'post': serializers.PostImportSerializer,
+    }
+    imported = dict.fromkeys(record_serializers, 0)
+    errors = []
+    invalid = 0
+    batch = []
+
+    def reject(number, detail):
+        nonlocal invalid
+        invalid += 1
+        if len(errors) < MAX_ERRORS:
+            errors.append({'line': number, 'errors': detail})
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            reject(number, ['Invalid JSON'])
+            continue
+        if not isinstance(record, dict):
+            reject(number, ['Expected an object'])
+            continue
+        record_type = record.get('type')
+        if record_type not in record_serializers:
+            reject(number, {'type': [f'Unknown record type {record_type!r}']})
+            continue
+
+        serializer = record_serializers[record_type](data=record)
+        if not serializer.is_valid():
+            reject(number, serializer.errors)
+            continue
+        batch.append((record_type, dict(serializer.validated_data)))
+        if len(batch) >= batch_size:
+            _write_batch(user, batch, imported)
+            batch = []
+    if batch:
+        _write_batch(user, batch, imported)
+    # Tags and ingredients are written in bulk, without signals
+    expire_user_responses(user.pk)
+
+    return {'imported': imported, 'invalid': invalid, 'errors': errors}
@@ -0,0 +1,120 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PostKeysetPagination(BasePagination):
+    """Keyset pagination on (creationDate, id), newest posts first
+
+    Pagination is only applied when the client asks for it with a
+    `page_size` or `cursor` query parameter, so plain list requests keep
+    returning a list. Each page seeks past the last row of the previous
+    one instead of using OFFSET, so deep pages cost the same as the first.
+    """
+    ordering = ('-creationDate', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = _('Invalid cursor')
+
+    def is_requested(self, request):
+        """Return True if the client opted into paginated results"""
+        params = request.query_params
+        return (
+            self.cursor_query_param in params or
+            self.page_size_query_param in params
+        )
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, capped"""
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, instance):
+        """Return an opaque token for the position of the given post"""
+        querystring = parse.urlencode({
+            'd': instance.creationDate.isoformat(),
+            'i': instance.pk,
+        })
+        return urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Return the (creationDate, id) position encoded in the request"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            querystring = urlsafe_b64decode(encoded.encode('ascii'))
+            tokens = parse.parse_qs(querystring.decode('ascii'))
+            creation_date = parse_datetime(tokens['d'][0])
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if creation_date is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return creation_date, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of posts following the request cursor"""
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            creation_date, pk = position
+            queryset = queryset.filter(
+                Q(creationDate__lt=creation_date) |
+                Q(creationDate=creation_date, id__lt=pk)
+            )
+
+        # Fetch one extra row to find out whether a next page exists
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+
+        return self.page
+
+    def get_next_link(self):
+        """Return the URL of the next page, or None on the last page"""
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class PostFeedPagination(PostKeysetPagination):
+    """Keyset pagination applied whether or not the client asks for it"""
+
+    def is_requested(self, request):
+        return True
@@ -1,55 +1,185 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from core import thumbnails
 from core.models import Tag, Ingredient, Post, Image
 
 
-class TagSerializer(serializers.ModelSerializer):
+class UserNameListSerializer(serializers.ListSerializer):
+    """Write many user owned objects, identified by (user, name), at once
+
+    create() inserts every new name with one INSERT and returns existing
+    rows for names the user already has. update() renames the rows of
+    `instance` with one UPDATE, pairing them up with the data by id.
+    """
+
+    def to_internal_value(self, data):
+        validated = super().to_internal_value(data)
+        if self.instance is None:
+            return validated
+
+        # id is read only on the child, so pair rows with the data here
+        known = {row.pk for row in self.instance}
+        errors = []
+        for attrs, item in zip(validated, data):
+            attrs['id'] = item.get('id')
+            if attrs['id'] in known:
+                errors.append({})
+            else:
+                errors.append({'id': [_('Unknown id')]})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(**attrs) for attrs in validated_data],
+                ignore_conflicts=True
+            )
+            rows = model.objects.filter(
+                user__in={attrs['user'] for attrs in validated_data},
+                name__in={attrs['name'] for attrs in validated_data}
+            )
+            by_key = {}
+            for row in rows:
+                by_key[(row.user_id, row.name)] = row
+                # Case insensitive collations, as on MySQL, treat names
+                # that differ in case as the same
+                by_key.setdefault((row.user_id, row.name.casefold()), row)
+
+        return [
+            by_key.get((attrs['user'].pk, attrs['name'])) or
+            by_key[(attrs['user'].pk, attrs['name'].casefold())]
+            for attrs in validated_data
+        ]
+
+    def update(self, instance, validated_data):
+        model = self.child.Meta.model
+        rows = {row.pk: row for row in instance}
+        fields = {name for attrs in validated_data for name in attrs} - {'id'}
+        # bulk_update skips pre_save, so bump auto_now fields here
+        now = timezone.now()
+        auto_now = [
+            field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        for attrs in validated_data:
+            row = rows[attrs['id']]
+            for name, value in attrs.items():
+                setattr(row, name, value)
+            for name in auto_now:
+                setattr(row, name, now)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_update(
+                    rows.values(), list(fields) + auto_now
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(_('Names must be unique'))
+
+        return [rows[attrs['id']] for attrs in validated_data]
+
+
+class UserNameSerializer(serializers.ModelSerializer):
+    """Base serializer for objects a user names at most once"""
+
+    def create(self, validated_data):
+        obj, created = self.Meta.model.objects.get_or_create(
+            **validated_data
+        )
+        return obj
+
+
+class TagSerializer(UserNameSerializer):
     """Serializer for tag object"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_Fields = ('id',)
+        list_serializer_class = UserNameListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UserNameSerializer):
     """Serializer for an ingredient object"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = UserNameListSerializer
 
 
 class PostImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to Post"""
     imageRef = serializers.ImageField(max_length=None, allow_empty_file=True, allow_null=True, required=False)
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Image
-        fields = ('id', 'imageRef',)
+        fields = ('id', 'imageRef', 'variants',)
         read_only_fields = ('id',)
 
+    def get_variants(self, obj):
+        """Return the URLs of the resized copies of the image"""
+        request = self.context.get('request')
+        urls = thumbnails.variant_urls(
+            obj.imageRef.name, obj.imageRef.storage
+        )
+        if request is None:
+            return urls
+        return {
+            variant: {
+                fmt: request.build_absolute_uri(url)
+                for fmt, url in formats.items()
+            }
+            for variant, formats in urls.items()
+        }
+
+
+class PostImagesUploadSerializer(serializers.Serializer):
+    """Serializer for uploading a batch of images to a Post"""
+    images = serializers.ListField(
+        child=serializers.ImageField(),
+        allow_empty=False
+    )
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field only accepting objects of the requesting user"""
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if request is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(user=request.user)
+
 
 class PostSerializer(serializers.ModelSerializer):
     """Serialize a Post"""
-    # images = PostImageSerializer(many=True)
-    # images = PostImageSerializer(many=True)
-    # ingredients = serializers.PrimaryKeyRelatedField(
-    #     many=True,
-    #     queryset=Ingredient.objects.all()
-    # )
-    # tags = serializers.PrimaryKeyRelatedField(
-    #     many=True,
-    #     queryset=Tag.objects.all()
-    # )
+    ingredients = UserOwnedPrimaryKeyRelatedField(
+        many=True,
+        queryset=Ingredient.objects.all()
+    )
+    tags = UserOwnedPrimaryKeyRelatedField(
+        many=True,
+        queryset=Tag.objects.all()
+    )
 
     class Meta:
         model = Post
         fields = (
             'id', 'title', 'time_minutes', 'price',
-            'link',
+            'link', 'ingredients', 'tags', 'rate_count', 'avg_rate', 'comment_count',
+        )
+        read_only_fields = (
+            'id', 'rate_count', 'avg_rate', 'comment_count',
         )
-        read_only_fields = ('id',)
 
     # def create(self, validated_data):
     #     print('xxxxxxxxxxxxxxxxxxxxxxxxxxxxxx')
@@ -63,8 +193,31 @@ class PostSerializer(serializers.ModelSerializer):
     #     return post
 
 
+class PostImportSerializer(serializers.ModelSerializer):
+    """Validate a post record of an NDJSON import"""
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255), default=list
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255), default=list
+    )
+
+    class Meta:
+        model = Post
+        fields = (
+            'title', 'time_minutes', 'price', 'link', 'category', 'content',
+            'tags', 'ingredients',
+        )
+        extra_kwargs = {
+            'content': {'required': False, 'allow_blank': True},
+        }
+
+
 class PostDetailSerializer(PostSerializer):
-    # ingredients = IngredientSerializer(many=True, read_only=True)
-    # tags = TagSerializer(many=True, read_only=True)
-    print("vwvwvwvvwvwvvwvwvwvwwv")
-    images = PostImageSerializer(many=True)
\ No newline at end of file
+    """Serialize a Post detail"""
+    ingredients = IngredientSerializer(many=True, read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+    images = PostImageSerializer(many=True, read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ('images',)
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountTestMixin:
+    """Assertions about the number of queries a request runs"""
+
+    def assertConstantQueries(self, url, populate, sizes=(10, 10000)):
+        """Assert the query count for url does not depend on data volume
+
+        `populate` is called with the number of rows to add before each
+        request, so every size is measured against a growing data set.
+        """
+        counts = []
+        created = 0
+        for size in sizes:
+            populate(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'Query count grows with data volume: {dict(zip(sizes, counts))}'
+        )
+        return counts[0]
@@ -11,6 +11,7 @@ from post .serializers import IngredientSerializer
 
 
 INGREDIENTS_URL = reverse('post:ingredient-list')
+BULK_INGREDIENTS_URL = reverse('post:ingredient-bulk')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -81,4 +82,14 @@ class PrivateIngredientsAPITests(TestCase):
         payload = {'name': ''}
         res = self.client.post(INGREDIENTS_URL, payload)
 
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_ingredients(self):
+        """Test creating many ingredients in one request"""
+        payload = [{'name': 'Kale'}, {'name': 'Salt'}]
+
+        res = self.client.post(BULK_INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([i['name'] for i in res.data], ['Kale', 'Salt'])
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
@@ -1,21 +1,34 @@
+import io
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Post, Tag, Ingredient
+from core.cache import get_response_cache
+from core.models import Post, PostRate, Tag, Ingredient, Image as PostImage
+from core.tests.factories import create_posts, create_tags, create_user
+from core.tests.helpers import run_on_commit
 
+from post import ndjson
+from post.pagination import PostKeysetPagination
 from post.serializers import PostSerializer, PostDetailSerializer
+from post.tests.helpers import QueryCountTestMixin
 
 
 POSTS_URL = reverse('post:post-list')
+FEED_URL = reverse('post:post-feed')
+EXPORT_URL = reverse('post:post-export')
+IMPORT_URL = reverse('post:post-import')
 
 def image_upload_url(post_id):
     """Return URL for post image upload"""
@@ -65,12 +78,14 @@ class PublicPostApiTests(TestCase):
 class PrivatePostApiTests(TestCase):
     """Test authenticated post API access"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+
     def setUp(self):
+        # Cached responses of the shared user outlive the rolled back rows
+        get_response_cache().clear()
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'test@londonappdev.com',
-            'testpass'
-        )
         self.client.force_authenticate(self.user)
 
     def test_retrieve_posts(self):
@@ -147,6 +162,21 @@ class PrivatePostApiTests(TestCase):
         self.assertIn(tag1, tags)
         self.assertIn(tag2, tags)
 
+    def test_create_post_with_other_users_tag(self):
+        """Test a post cannot reference the tags of another user"""
+        other = create_user('other@londonappdev.com')
+        payload = {
+            'title': 'Borrowed tags',
+            'tags': [sample_tag(user=other).id],
+            'time_minutes': 30,
+            'price': 10.00
+        }
+        res = self.client.post(POSTS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Post.objects.filter(user=self.user).exists())
+
     def test_create_post_with_ingredients(self):
         """Test creating post with ingredients"""
         ingredient1 = sample_ingredient(user=self.user, name='Ingredient 1')
@@ -167,6 +197,18 @@ class PrivatePostApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_update_post_with_other_users_ingredient(self):
+        """Test a post cannot reference the ingredients of another user"""
+        post = sample_post(user=self.user)
+        other = create_user('other@londonappdev.com')
+        payload = {'ingredients': [sample_ingredient(user=other).id]}
+
+        res = self.client.patch(detail_url(post.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ingredients', res.data)
+        self.assertFalse(post.ingredients.exists())
+
     def test_partial_update_post(self):
         """Test updating a post with patch"""
         post = sample_post(user=self.user)
@@ -203,39 +245,465 @@ class PrivatePostApiTests(TestCase):
         tags = post.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_filter_posts_by_tags_without_duplicates(self):
+        """Test a post matching several tags is only returned once"""
+        post = sample_post(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Vegetarian')
+        post.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            POSTS_URL,
+            {'tags': '{},{}'.format(tag1.id, tag2.id)}
+        )
+
+        self.assertEqual([item['id'] for item in res.data], [post.id])
+
+    def test_filter_posts_matching_all_tags(self):
+        """Test match=all only returns posts having every tag"""
+        post1 = sample_post(user=self.user, title='Thai vegetable curry')
+        post2 = sample_post(user=self.user, title='Aubergine with tahini')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Spicy')
+        post1.tags.add(tag1, tag2)
+        post2.tags.add(tag1)
+
+        res = self.client.get(
+            POSTS_URL,
+            {'tags': '{},{}'.format(tag1.id, tag2.id), 'match': 'all'}
+        )
+
+        self.assertEqual([item['id'] for item in res.data], [post1.id])
+
+    def test_filter_posts_matching_all_ingredients(self):
+        """Test match=all works for ingredients"""
+        post1 = sample_post(user=self.user, title='Posh beans on toast')
+        post2 = sample_post(user=self.user, title='Beans on toast')
+        ingredient1 = sample_ingredient(user=self.user, name='Feta cheese')
+        ingredient2 = sample_ingredient(user=self.user, name='Beans')
+        post1.ingredients.add(ingredient1, ingredient2)
+        post2.ingredients.add(ingredient2)
+
+        res = self.client.get(POSTS_URL, {
+            'ingredients': '{},{}'.format(ingredient1.id, ingredient2.id),
+            'match': 'all',
+        })
+
+        self.assertEqual([item['id'] for item in res.data], [post1.id])
+
+    def test_filter_invalid_match(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(POSTS_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PostPaginationTests(TestCase):
+    """Test keyset pagination of the post list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_unpaginated_by_default(self):
+        """Test the list stays a plain list when no page is requested"""
+        sample_post(user=self.user)
+
+        res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_paginate_posts_with_cursor(self):
+        """Test walking every page of posts with the next cursor"""
+        posts = [sample_post(user=self.user, title=f'Post {i}')
+                 for i in range(5)]
+
+        res = self.client.get(POSTS_URL, {'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(item['id'] for item in res.data['results'])
+
+        expected = Post.objects.order_by('-creationDate', '-id')
+        self.assertEqual(seen, [post.id for post in expected])
+        self.assertEqual(len(seen), len(posts))
+
+    def test_page_size_is_capped(self):
+        """Test the page size cannot exceed the maximum"""
+        create_posts(self.user, 3)
+
+        with patch.object(PostKeysetPagination, 'max_page_size', 2):
+            res = self.client.get(POSTS_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns not found"""
+        res = self.client.get(POSTS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PostSearchTests(TestCase):
+    """Test full-text search of posts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+
+    def setUp(self):
+        # Cached responses of the shared user outlive the rolled back rows
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_search_ranks_matches(self):
+        """Test search returns matching posts, most relevant first"""
+        post1 = sample_post(user=self.user, title='Pasta bake',
+                            content='Cheese and pasta and more pasta')
+        post2 = sample_post(user=self.user, title='Salad',
+                            content='Goes well with pasta')
+        sample_post(user=self.user, title='Fish and chips')
+
+        res = self.client.get(POSTS_URL, {'q': 'pasta'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data],
+                         [post1.id, post2.id])
+
+    def test_search_follows_updates_and_deletes(self):
+        """Test the index is refreshed when posts change"""
+        post = sample_post(user=self.user, title='Pasta bake')
+        sample_post(user=self.user, title='Pasta salad').delete()
+
+        post.title = 'Lasagne'
+        post.save()
+
+        self.assertEqual(
+            self.client.get(POSTS_URL, {'q': 'pasta'}).data, []
+        )
+        res = self.client.get(POSTS_URL, {'q': 'lasa'})
+        self.assertEqual([item['id'] for item in res.data], [post.id])
+
+    def test_search_limited_to_user(self):
+        """Test search does not return other users' posts"""
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'pass'
+        )
+        sample_post(user=user2, title='Pasta bake')
+
+        res = self.client.get(POSTS_URL, {'q': 'pasta'})
+
+        self.assertEqual(res.data, [])
+
+    def test_search_without_full_text_index(self):
+        """Test other databases match every word as a substring"""
+        post = sample_post(user=self.user, title='Pasta bake',
+                           content='With cheese')
+        sample_post(user=self.user, title='Pasta salad')
+
+        with patch.object(connection, 'vendor', 'postgresql'):
+            res = self.client.get(POSTS_URL, {'q': 'pasta chee'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [post.id])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PostQueryCountTests(QueryCountTestMixin, TestCase):
+    """Test post endpoints run a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+        cls.tags = create_tags(cls.user, 'Tag 0', 'Tag 1', 'Tag 2')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_posts(self, count):
+        """Bulk create posts that each have tags and images"""
+        posts = create_posts(
+            self.user, count, title='Bulk post', time_minutes=5, price=1
+        )
+        Through = Post.tags.through
+        Through.objects.bulk_create(
+            Through(post_id=post.pk, tag_id=tag.pk)
+            for post in posts for tag in self.tags
+        )
+        PostImage.objects.bulk_create(
+            PostImage(post=post, imageRef='uploads/post/sample.jpg')
+            for post in posts
+        )
+
+    def test_list_query_count_is_constant(self):
+        """Test listing posts does not run a query per post"""
+        self.assertConstantQueries(POSTS_URL, self._add_posts)
+
+    def test_detail_prefetches_relations(self):
+        """Test post detail loads its relations in fixed queries"""
+        self._add_posts(1)
+        post = Post.objects.get(user=self.user)
+
+        # The conditional GET validators, the post and its three relations
+        with self.assertNumQueries(5):
+            res = self.client.get(detail_url(post.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(len(res.data['images']), 1)
+
+
+class PostResponseCacheTests(TestCase):
+    """Test post responses are cached and invalidated on writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+
+    def setUp(self):
+        # Cached responses of the shared user outlive the rolled back rows
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request only runs the validator query"""
+        sample_post(user=self.user)
+        first = self.client.get(POSTS_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(POSTS_URL)
+
+        self.assertEqual(first.data, second.data)
+
+    def test_writes_invalidate_cache(self):
+        """Test creating, tagging and deleting posts expires the cache"""
+        self.client.get(POSTS_URL)
+        with run_on_commit():
+            res = self.client.post(POSTS_URL, {
+                'title': 'Test post', 'time_minutes': 30, 'price': 10.00,
+            })
+        post_id = res.data['id']
+        self.assertEqual(len(self.client.get(POSTS_URL).data), 1)
+
+        with run_on_commit():
+            tag = sample_tag(user=self.user)
+            Post.objects.get(id=post_id).tags.add(tag)
+        res = self.client.get(detail_url(post_id))
+        self.assertEqual([item['id'] for item in res.data['tags']], [tag.id])
+
+        with run_on_commit():
+            self.client.delete(detail_url(post_id))
+        self.assertEqual(self.client.get(POSTS_URL).data, [])
+
+    def test_cache_is_per_user(self):
+        """Test cached responses are not shared between users"""
+        sample_post(user=self.user)
+        self.client.get(POSTS_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'pass'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.data, [])
+
+
+class PostConditionalGetTests(TestCase):
+    """Test conditional GET on post endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list answers 304 before serializing"""
+        sample_post(user=self.user)
+        res = self.client.get(POSTS_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_write(self):
+        """Test the ETag changes when a post changes"""
+        post = sample_post(user=self.user)
+        etag = self.client.get(POSTS_URL)['ETag']
 
+        PostRate.objects.create(user=self.user, post=post, rate=5)
+        res = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_retrieve_not_modified(self):
+        """Test an unchanged post detail answers 304"""
+        post = sample_post(user=self.user)
+        res = self.client.get(detail_url(post.id))
+
+        res = self.client.get(
+            detail_url(post.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_delete(self):
+        """Test deleting a post changes the list ETag"""
+        sample_post(user=self.user)
+        post = sample_post(user=self.user)
+        etag = self.client.get(POSTS_URL)['ETag']
+
+        with run_on_commit():
+            self.client.delete(detail_url(post.id))
+        res = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_modified_after_tag_writes(self):
+        """Test renaming or deleting a tag of a post changes its ETag"""
+        post = sample_post(user=self.user)
+        tag = sample_tag(user=self.user, name='Spicy')
+        post.tags.add(tag)
+        bulk_url = reverse('post:tag-bulk')
+
+        for method, payload in (
+            ('patch', [{'id': tag.id, 'name': 'Mild'}]),
+            ('delete', [tag.id]),
+        ):
+            etag = self.client.get(detail_url(post.id))['ETag']
+            with run_on_commit():
+                getattr(self.client, method)(bulk_url, payload, format='json')
+            res = self.client.get(
+                detail_url(post.id), HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK, method)
+        self.assertEqual(res.data['tags'], [])
+
+
+def sample_image_file(suffix='.jpg'):
+    """Return an open temporary file holding a small JPEG"""
+    ntf = tempfile.NamedTemporaryFile(suffix=suffix)
+    Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+    ntf.seek(0)
+    return ntf
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class PostImageUploadTests(TestCase):
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user@londonappdev.com')
+
     def setUp(self):
         self.client = APIClient()
-        self.user = get_user_model().objects.create_user('user', 'testpass')
         self.client.force_authenticate(self.user)
         self.post = sample_post(user=self.user)
 
     def tearDown(self):
-        self.post.image.delete()
+        for image in self.post.images.all():
+            image.imageRef.delete()
 
     def test_upload_image_to_post(self):
         """Test uploading an image to post"""
         url = image_upload_url(self.post.id)
-        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
-            img = Image.new('RGB', (10, 10))
-            img.save(ntf, format='JPEG')
-            ntf.seek(0)
-            res = self.client.post(url, {'image': ntf}, format='multipart')
+        with sample_image_file() as ntf:
+            res = self.client.post(url, {'images': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        image = self.post.images.get()
+        self.assertEqual(res.data[0]['id'], image.id)
+        self.assertTrue(os.path.exists(image.imageRef.path))
+
+    def test_upload_image_updates_post(self):
+        """Test uploading images moves the post's updatedDate"""
+        updated = self.post.updatedDate
+        url = image_upload_url(self.post.id)
+        with sample_image_file() as ntf:
+            self.client.post(url, {'images': ntf}, format='multipart')
 
         self.post.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn('image', res.data)
-        self.assertTrue(os.path.exists(self.post.image.path))
+        self.assertGreater(self.post.updatedDate, updated)
+
+    def test_upload_many_images_to_post(self):
+        """Test uploading a batch of images in one request"""
+        url = image_upload_url(self.post.id)
+        files = [sample_image_file() for _ in range(3)]
+        res = self.client.post(url, {'images': files}, format='multipart')
+        for ntf in files:
+            ntf.close()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(self.post.images.count(), 3)
+
+    def test_upload_same_image_stored_once(self):
+        """Test identical uploads share one content-addressed file"""
+        url = image_upload_url(self.post.id)
+        files = [sample_image_file() for _ in range(2)]
+        res = self.client.post(url, {'images': files}, format='multipart')
+        for ntf in files:
+            ntf.close()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        first, second = self.post.images.order_by('id')
+        self.assertEqual(first.imageRef.name, second.imageRef.name)
+        self.assertTrue(first.imageRef.name.startswith('uploads/blobs/'))
+
+    def test_reupload_returns_only_new_images(self):
+        """Test uploading a file again only answers with the new row"""
+        url = image_upload_url(self.post.id)
+        with sample_image_file() as ntf:
+            self.client.post(url, {'images': ntf}, format='multipart')
+        with sample_image_file() as ntf:
+            res = self.client.post(url, {'images': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        first, second = self.post.images.order_by('id')
+        self.assertEqual([image['id'] for image in res.data], [second.id])
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.post.id)
-        res = self.client.post(url, {'image': 'notimage'}, format='multipart')
+        res = self.client.post(url, {'images': 'notimage'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.post.images.exists())
 
+    def test_upload_too_many_images(self):
+        """Test uploads over the file limit are refused"""
+        url = image_upload_url(self.post.id)
+        files = [sample_image_file() for _ in range(3)]
+        limits = {
+            'MAX_FILES': 2,
+            'MAX_FILE_SIZE': 1024 * 1024,
+            'MAX_REQUEST_SIZE': 1024 * 1024,
+        }
+        with self.settings(POST_IMAGE_UPLOAD=limits):
+            res = self.client.post(url, {'images': files}, format='multipart')
+        for ntf in files:
+            ntf.close()
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(self.post.images.exists())
 
     def test_filter_posts_by_tags(self):
         """Test returning posts with specific tags"""
@@ -279,4 +747,190 @@ class PostImageUploadTests(TestCase):
         serializer3 = PostSerializer(post3)
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
\ No newline at end of file
+        self.assertNotIn(serializer3.data, res.data)
+
+
+class PostExportImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user@londonappdev.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self):
+        """Export the posts of the user and return the parsed records"""
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content)
+        return [json.loads(line) for line in content.splitlines()]
+
+    def import_lines(self, lines):
+        """Post NDJSON lines to the import endpoint"""
+        return self.client.post(
+            IMPORT_URL, b''.join(line + b'\n' for line in lines),
+            content_type='application/x-ndjson'
+        )
+
+    def test_export_posts(self):
+        """Test exporting tags, ingredients and posts of the user only"""
+        post = sample_post(user=self.user, title='Curry')
+        post.tags.add(sample_tag(user=self.user, name='Spicy'))
+        post.ingredients.add(sample_ingredient(user=self.user, name='Chili'))
+        sample_tag(user=self.user, name='Unused')
+        other = get_user_model().objects.create_user('other', 'testpass')
+        sample_post(user=other, title='Not mine')
+
+        records = self.export()
+
+        self.assertEqual(records[:3], [
+            {'type': 'tag', 'name': 'Spicy'},
+            {'type': 'tag', 'name': 'Unused'},
+            {'type': 'ingredient', 'name': 'Chili'},
+        ])
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[3]['title'], 'Curry')
+        self.assertEqual(records[3]['tags'], ['Spicy'])
+        self.assertEqual(records[3]['ingredients'], ['Chili'])
+
+    def test_export_prefetches_per_chunk(self):
+        """Test the export query count does not grow with the post count"""
+        for i in range(5):
+            post = sample_post(user=self.user, title=f'Post {i}')
+            post.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+
+        # Tags, ingredients, posts, then tags, ingredients, images
+        with self.assertNumQueries(6):
+            self.export()
+
+    def test_import_posts(self):
+        """Test importing records creates posts linked to named tags"""
+        existing = sample_tag(user=self.user, name='Spicy')
+        lines = [
+            b'{"type": "tag", "name": "Quick"}',
+            json.dumps({
+                'type': 'post', 'title': 'Curry', 'time_minutes': 30,
+                'price': '7.50', 'tags': ['Spicy', 'Hot'],
+                'ingredients': ['Chili'],
+            }).encode(),
+        ]
+
+        res = self.import_lines(lines)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['imported'], {'tag': 1, 'ingredient': 0, 'post': 1}
+        )
+        post = Post.objects.get(user=self.user)
+        self.assertEqual(post.title, 'Curry')
+        self.assertIn(existing, post.tags.all())
+        self.assertCountEqual(
+            Tag.objects.filter(user=self.user).values_list('name', flat=True),
+            ['Spicy', 'Hot', 'Quick']
+        )
+        self.assertEqual(post.ingredients.get().name, 'Chili')
+
+    def test_import_reports_invalid_lines(self):
+        """Test invalid lines are skipped and reported by line number"""
+        lines = [
+            b'not json',
+            b'{"type": "post", "title": "No price", "time_minutes": 5}',
+            b'{"type": "tag", "name": "Quick"}',
+        ]
+
+        res = self.import_lines(lines)
+
+        self.assertEqual(res.data['invalid'], 2)
+        self.assertEqual(
+            [error['line'] for error in res.data['errors']], [1, 2]
+        )
+        self.assertIn('price', res.data['errors'][1]['errors'])
+        self.assertTrue(Tag.objects.filter(name='Quick').exists())
+
+    @override_settings(NDJSON_MAX_LINE_SIZE=40)
+    def test_import_refuses_long_lines(self):
+        """Test a line over the size limit fails the import with a 400"""
+        lines = [
+            b'{"type": "tag", "name": "Quick"}',
+            b'{"type": "tag", "name": "' + b'x' * 100 + b'"}',
+        ]
+
+        res = self.import_lines(lines)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(b'Line 2', res.content)
+
+    def test_read_lines_up_to_limit(self):
+        """Test lines of exactly the limit are read, newline or not"""
+        stream = io.BytesIO(b'abcd\nefgh')
+
+        self.assertEqual(
+            list(ndjson.read_lines(stream, 4)), [b'abcd\n', b'efgh']
+        )
+
+    def test_export_import_round_trip(self):
+        """Test an export imports into another account unchanged"""
+        post = sample_post(user=self.user, title='Curry')
+        post.tags.add(sample_tag(user=self.user, name='Spicy'))
+        lines = b''.join(
+            self.client.get(EXPORT_URL).streaming_content
+        ).splitlines()
+        other = get_user_model().objects.create_user('other', 'testpass')
+        self.client.force_authenticate(other)
+
+        self.import_lines(lines)
+
+        imported = Post.objects.get(user=other)
+        self.assertEqual(imported.title, 'Curry')
+        self.assertEqual(imported.tags.get().name, 'Spicy')
+
+
+class PostFeedTests(TestCase):
+    """Test the feed of posts, tag counts and profile"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('test@londonappdev.com', username='tester')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_feed(self):
+        """Test the feed has the first page, tag counts and profile"""
+        spicy, quick = create_tags(self.user, 'Spicy', 'Quick')
+        posts = create_posts(self.user, 3)
+        for post in posts:
+            post.tags.add(spicy)
+        posts[0].tags.add(quick)
+        sample_tag(create_user('other@londonappdev.com'), 'Other')
+
+        res = self.client.get(FEED_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [post['id'] for post in res.data['posts']['results']],
+            [posts[2].id, posts[1].id]
+        )
+        self.assertIsNotNone(res.data['posts']['next'])
+        self.assertEqual(res.data['tags'], [
+            {'id': spicy.id, 'name': 'Spicy', 'posts': 3},
+            {'id': quick.id, 'name': 'Quick', 'posts': 1},
+        ])
+        self.assertEqual(res.data['profile'], {
+            'email': 'test@londonappdev.com', 'username': 'tester',
+        })
+
+    def test_feed_is_paginated_by_default(self):
+        """Test the feed pages posts without pagination parameters"""
+        create_posts(self.user, PostKeysetPagination.page_size + 1)
+
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(
+            len(res.data['posts']['results']),
+            PostKeysetPagination.page_size
+        )
@@ -1,16 +1,19 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.cache import get_response_cache
 from core.models import Tag, Post
+from core.tests.factories import create_tags, create_users
+from core.tests.helpers import run_on_commit
 
 from post.serializers import TagSerializer
 
 
 TAGS_URL = reverse('post:tag-list')
+BULK_TAGS_URL = reverse('post:tag-bulk')
 
 
 class PublicTagsApiTests(TestCase):
@@ -29,11 +32,15 @@ class PublicTagsApiTests(TestCase):
 class PrivateTagsApiTests(TestCase):
     """Test the authorized user tags API"""
 
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'test@londonappdev.com',
-            'password'
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = create_users(
+            'test@londonappdev.com', 'other@londonappdev.com'
         )
+
+    def setUp(self):
+        # Cached responses of the shared user outlive the rolled back rows
+        get_response_cache().clear()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
@@ -51,11 +58,7 @@ class PrivateTagsApiTests(TestCase):
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for authenticated user"""
-        user2 = get_user_model().objects.create_user(
-            'other@londonappdev.com',
-            'testpass'
-        )
-        Tag.objects.create(user=user2, name='Fruity')
+        Tag.objects.create(user=self.other, name='Fruity')
         tag = Tag.objects.create(user=self.user, name='Comfort Food')
 
         res = self.client.get(TAGS_URL)
@@ -75,6 +78,117 @@ class PrivateTagsApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_tags_not_modified(self):
+        """Test an unchanged tag list answers 304 until a tag changes"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with run_on_commit():
+            tag.name = 'Vegetarian'
+            tag.save()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_existing_tag_returns_it(self):
+        """Test creating a tag the user already has returns that tag"""
+        tag = Tag.objects.create(user=self.user, name='Simple')
+
+        res = self.client.post(TAGS_URL, {'name': 'Simple'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags at once keeps the ones that exist"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Dessert'}]
+
+        with self.assertNumQueries(4):
+            res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0]['id'], vegan.id)
+        self.assertEqual(res.data[1], res.data[2])
+        names = Tag.objects.filter(user=self.user).values_list('name', flat=True)
+        self.assertCountEqual(names, ['Vegan', 'Dessert'])
+
+    def test_bulk_create_expires_cached_list(self):
+        """Test tags created in bulk show up in a cached tag list"""
+        self.client.get(TAGS_URL)
+
+        with run_on_commit():
+            self.client.post(
+                BULK_TAGS_URL, [{'name': 'Vegan'}], format='json'
+            )
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+
+    def test_bulk_create_tags_invalid(self):
+        """Test one invalid object rejects the whole batch"""
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+
+        res = self.client.post(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_rename_tags(self):
+        """Test renaming many tags at once"""
+        tag1, tag2 = create_tags(self.user, 'Vegan', 'Dessert')
+        payload = [
+            {'id': tag1.id, 'name': 'Vegetarian'},
+            {'id': tag2.id, 'name': 'Sweet'},
+        ]
+
+        res = self.client.patch(BULK_TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegetarian')
+        self.assertEqual(tag2.name, 'Sweet')
+
+    def test_bulk_rename_other_users_tag(self):
+        """Test tags of other users cannot be renamed"""
+        tag = Tag.objects.create(user=self.other, name='Vegan')
+
+        res = self.client.patch(
+            BULK_TAGS_URL, [{'id': tag.id, 'name': 'Mine'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_rename_to_existing_name(self):
+        """Test a rename clashing with another tag is refused"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(
+            BULK_TAGS_URL, [{'id': tag.id, 'name': 'Vegan'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_tags(self):
+        """Test deleting many tags, leaving other users' tags alone"""
+        other = Tag.objects.create(user=self.other, name='Vegan')
+        tag1, tag2 = create_tags(self.user, 'Vegan', 'Dessert')
+
+        res = self.client.delete(
+            BULK_TAGS_URL, [tag1.id, tag2.id, other.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Tag.objects.all()), [other])
+
     def test_create_tag_invalid(self):
         """Test creating a new tag with invalid payload"""
         payload = {'name': ''}
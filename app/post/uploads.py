@@ -0,0 +1,55 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    StopUpload, TemporaryFileUploadHandler
+)
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to temporary files within request limits
+
+    Every file goes to disk chunk by chunk, whatever its size, so a large
+    batch of photos never sits in worker memory. The upload stops as soon
+    as the request exceeds the POST_IMAGE_UPLOAD limits, and `exceeded`
+    then says which limit was hit. Each file is hashed as it arrives and
+    gets its digest as `sha256`, which core.storage names the blob by.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        limits = settings.POST_IMAGE_UPLOAD
+        self.max_files = limits['MAX_FILES']
+        self.max_file_size = limits['MAX_FILE_SIZE']
+        self.max_request_size = limits['MAX_REQUEST_SIZE']
+        self.file_count = 0
+        self.total_size = 0
+        self.exceeded = None
+
+    def new_file(self, *args, **kwargs):
+        self.file_count += 1
+        if self.file_count > self.max_files:
+            self.exceeded = f'At most {self.max_files} files per upload'
+            raise StopUpload()
+        self.file_size = 0
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_size += len(raw_data)
+        self.total_size += len(raw_data)
+        if self.file_size > self.max_file_size:
+            self.exceeded = f'Files must be at most {self.max_file_size} bytes'
+            raise StopUpload()
+        if self.total_size > self.max_request_size:
+            self.exceeded = (
+                f'Uploads must be at most {self.max_request_size} bytes'
+            )
+            raise StopUpload()
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
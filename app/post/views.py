@@ -1,20 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework import viewsets, mixins, status, serializers as drf_serializers
+from rest_framework.relations import ManyRelatedField
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 
+from core import fanout, search, thumbnails
+from core.authentication import CachedTokenAuthentication
+from core.cache import (
+    CachedListMixin, CachedRetrieveMixin, expire_user_responses
+)
+from core.conditional import ConditionalListMixin, ConditionalRetrieveMixin
 from core.models import Tag, Ingredient, Post, Image
+from core.routers import ReplicaReadMixin
 
-from post import serializers
+from post import ndjson, serializers
+from post.pagination import PostFeedPagination, PostKeysetPagination
+from post.uploads import LimitedTemporaryFileUploadHandler
+from user.serializers import UserSerializer
 
 
-class TagViewSet(viewsets.GenericViewSet,
+class BulkNameMixin:
+    """Create, rename or delete many user owned objects per request
+
+    POST to `bulk/` takes a list of objects and creates the new names,
+    PATCH takes a list of objects with their ids and renames them, DELETE
+    takes a list of ids. Each request is written in one transaction.
+    """
+    bulk_max_objects = 1000
+
+    def _bulk_data(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError(_('Expected a list'))
+        if len(request.data) > self.bulk_max_objects:
+            raise ValidationError(
+                _('At most %d objects per request') % self.bulk_max_objects
+            )
+        return request.data
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """Write a list of objects at once"""
+        data = self._bulk_data(request)
+        if request.method == 'DELETE':
+            ids = drf_serializers.ListField(
+                child=drf_serializers.IntegerField()
+            ).run_validation(data)
+            with transaction.atomic():
+                self.get_queryset().filter(id__in=ids).delete()
+            expire_user_responses(request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        instance = None
+        if request.method == 'PATCH':
+            ids = [item.get('id') for item in data if isinstance(item, dict)]
+            instance = self.get_queryset().filter(
+                id__in=[pk for pk in ids if isinstance(pk, int)]
+            )
+        serializer = self.get_serializer(
+            instance, data=data, many=True, partial=instance is not None
+        )
+        serializer.is_valid(raise_exception=True)
+        if instance is None:
+            serializer.save(user=request.user)
+        else:
+            serializer.save()
+        # Bulk writes skip signals, so do their work here
+        expire_user_responses(request.user.pk)
+
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if instance is None
+            else status.HTTP_200_OK
+        )
+
+
+class TagViewSet(ReplicaReadMixin,
+                 BulkNameMixin,
+                 ConditionalListMixin,
+                 CachedListMixin,
+                 viewsets.GenericViewSet,
                  mixins.ListModelMixin,
                  mixins.CreateModelMixin):
     """Manage tags in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
@@ -28,10 +104,14 @@ class TagViewSet(viewsets.GenericViewSet,
         serializer.save(user=self.request.user)
 
 
-class IngredientViewSet(viewsets.GenericViewSet,
-                        mixins.ListModelMixin):
+class IngredientViewSet(ReplicaReadMixin,
+                        BulkNameMixin,
+                        CachedListMixin,
+                        viewsets.GenericViewSet,
+                        mixins.ListModelMixin,
+                        mixins.CreateModelMixin):
     """Manage ingredients in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
@@ -40,12 +120,16 @@ class IngredientViewSet(viewsets.GenericViewSet,
         """Return objects for the current authenticated user only"""
         return self.queryset.filter(user=self.request.user).order_by('-name')
 
+    def perform_create(self, serializer):
+        """Create a new ingredient"""
+        serializer.save(user=self.request.user)
+
 
 class BasePostAttrViewSet(viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned Post attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
 
@@ -61,96 +145,232 @@ class BasePostAttrViewSet(viewsets.GenericViewSet,
         ).order_by('-name').distinct()
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    """Manage Posts in the database"""
+class PostViewSet(ReplicaReadMixin,
+                  ConditionalRetrieveMixin,
+                  ConditionalListMixin,
+                  CachedRetrieveMixin,
+                  CachedListMixin,
+                  viewsets.ModelViewSet):
+    """Manage Posts in the database
+
+    The tags, ingredients and images of the posts listed or retrieved are
+    read concurrently, see core.fanout.
+    """
     serializer_class = serializers.PostSerializer
-    queryset = Post.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = fanout.ConcurrentPrefetchQuerySet(Post)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     parser_classes = (JSONParser, MultiPartParser, FormParser,)
+    pagination_class = PostKeysetPagination
+    search_limit = 50
+    # Counters are maintained with UPDATEs that leave updatedDate alone
+    # Details show tags, ingredients and images, which can change without
+    # moving updatedDate
+    send_last_modified = False
+    validator_aggregates = {
+        'rate_sum': Sum('rate_sum'),
+        'rate_count': Sum('rate_count'),
+        'comment_count': Sum('comment_count'),
+    }
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(',')]
     
+    def _filter_by_related(self, queryset, field_name, ids, match):
+        """Filter posts linked to any or all of the given related ids"""
+        field = Post._meta.get_field(field_name)
+        related_name = field.m2m_reverse_field_name()
+        matching = field.remote_field.through.objects.filter(
+            **{f'{related_name}__in': ids}
+        ).values('post_id')
+        if match == 'all':
+            # One row per post with a HAVING on the matched link count;
+            # (post, related) is unique so the count needs no DISTINCT
+            matching = matching.annotate(
+                matched=Count(related_name)
+            ).filter(matched=len(set(ids)))
+
+        return queryset.filter(id__in=matching.values('post_id'))
+
     def get_queryset(self):
         """Retrieve the posts for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': _('Must be "any" or "all".')})
+
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_by_related(
+                queryset, 'tags', tag_ids, match
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-    
-        return queryset.filter(user=self.request.user)
-
-    # def get_serializer_class(self):
-    #     """Return appropriate serializer class"""
-    #     return serializers.PostSerializer
-        # if self.action == 'retrieve':
-        #     return serializers.PostDetailSerializer
-        # elif self.action == 'upload_image':
-        #     return serializers.PostImageSerializer
-
-        # return self.serializer_class
-
- 
-    def post(self, request, *args, **kwargs):
-        # property_id = request.data['property_id']
-        files_list = request.FILES
-        data = request.data
-        print(len(files_list))
-        print(len(data))
-        # serializer = self.get_serializer(
-        #     post,
-        #     data=request.data
-        # )
-        # serializer.save(user=self.request.user)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
-        # converts querydict to original dict
-        # images = dict((request.data).lists())['image']
-        # flag = 1
-        # arr = []
-        # for img_name in images:
-        #     modified_data = modify_input_for_multiple_files(property_id,
-        #                                                     img_name)
-        #     file_serializer = ImageSerializer(data=modified_data)
-        #     if file_serializer.is_valid():
-        #         file_serializer.save()
-        #         arr.append(file_serializer.data)
-        #     else:
-        #         flag = 0
-
-        # if flag == 1:
-        #     return Response(arr, status=status.HTTP_201_CREATED)
-        # else:
-        #     return Response(arr, status=status.HTTP_400_BAD_REQUEST)
+            queryset = self._filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+
+        queryset = self._prefetch_for_serializer(queryset).filter(
+            user=self.request.user
+        ).order_by(*PostKeysetPagination.ordering)
+
+        query = self.request.query_params.get('q')
+        if query:
+            queryset = search.search_posts(queryset, query)
+            if self.action == 'list':
+                queryset = queryset[:self.search_limit]
+
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        """Return search results as one ranked list, not a cursor page"""
+        if self.request.query_params.get('q'):
+            return None
+        return super().paginate_queryset(queryset)
+
+    def _prefetch_for_serializer(self, queryset):
+        """Load the relations rendered by the active serializer up front"""
+        select = ['user']
+        prefetch = []
+        for field in self.get_serializer().fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, (ManyRelatedField,
+                                  drf_serializers.ListSerializer)):
+                prefetch.append(field.source)
+            elif isinstance(field, drf_serializers.BaseSerializer):
+                select.append(field.source)
 
+        return queryset.select_related(*select).prefetch_related(*prefetch)
+
+    def get_serializer_class(self):
+        """Return appropriate serializer class"""
+        if self.action == 'retrieve':
+            return serializers.PostDetailSerializer
+        elif self.action == 'upload_image':
+            return serializers.PostImagesUploadSerializer
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new ingredient"""
         serializer.save(user=self.request.user)
 
-    # @action(methods=['POST'], detail=True, url_path='upload-image')
-    # def upload_image(self, request, pk=None):
-    #     """Upload an image to a post"""
-    #     post = self.get_object()
-    #     serializer = self.get_serializer(
-    #         post,
-    #         data=request.data
-    #     )
-
-    #     if serializer.is_valid():
-    #         serializer.save()
-    #         return Response(
-    #             serializer.data,
-    #             status=status.HTTP_200_OK
-    #         )
-
-    #     return Response(
-    #         serializer.errors,
-    #         status=status.HTTP_400_BAD_REQUEST
-    #     )
\ No newline at end of file
+    @action(methods=['POST'], detail=True, url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """Upload a batch of images to a post"""
+        limit = settings.POST_IMAGE_UPLOAD['MAX_REQUEST_SIZE']
+        if int(request.META.get('CONTENT_LENGTH') or 0) > limit:
+            return Response(
+                {'detail': f'Uploads must be at most {limit} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        handler = LimitedTemporaryFileUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+
+        post = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        if handler.exceeded:
+            return Response(
+                {'detail': handler.exceeded},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        serializer.is_valid(raise_exception=True)
+
+        images = []
+        try:
+            for upload in serializer.validated_data['images']:
+                image = Image(post=post)
+                image.imageRef.save(upload.name, upload, save=False)
+                images.append(image)
+            names = {image.imageRef.name for image in images}
+            with transaction.atomic():
+                # The post's images changed, so did the post. Updating it
+                # first also locks it against concurrent uploads.
+                Post.objects.filter(pk=post.pk).update(
+                    updatedDate=timezone.now()
+                )
+                # bulk_create only sets primary keys on PostgreSQL, and
+                # identical files share a name, so tell the new rows apart
+                # from those already there
+                existing = list(
+                    Image.objects.filter(post=post, imageRef__in=names)
+                    .values_list('id', flat=True)
+                )
+                Image.objects.bulk_create(images)
+                created = list(
+                    Image.objects.filter(post=post, imageRef__in=names)
+                    .exclude(id__in=existing).order_by('id')
+                )
+        except Exception:
+            for image in images:
+                image.imageRef.delete(save=False)
+            raise
+
+        # bulk_create skips signals, so do their work here
+        expire_user_responses(post.user_id)
+        storage = Image._meta.get_field('imageRef').storage
+        for name in names:
+            thumbnails.schedule_variants(name, storage)
+        return Response(
+            serializers.PostImageSerializer(
+                created, many=True, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET'], detail=False)
+    def feed(self, request):
+        """Return a page of posts with the user's tag counts and profile
+
+        The page and the tag counts are read concurrently.
+        """
+        paginator = PostFeedPagination()
+
+        def read_page():
+            posts = paginator.paginate_queryset(
+                self.get_queryset(), request, view=self
+            )
+            return paginator.get_paginated_response(
+                self.get_serializer(posts, many=True).data
+            ).data
+
+        def read_tags():
+            return list(
+                Tag.objects.filter(user=request.user)
+                .annotate(posts=Count('post'))
+                .order_by('-posts', 'name')
+                .values('id', 'name', 'posts')
+            )
+
+        page, tags = fanout.gather(read_page, read_tags)
+        return Response({
+            'posts': page,
+            'tags': tags,
+            'profile': UserSerializer(request.user).data,
+        })
+
+    @action(
+        methods=['GET'], detail=False, url_path='export',
+        renderer_classes=[ndjson.NDJSONRenderer]
+    )
+    def export(self, request):
+        """Stream every tag, ingredient and post of the user as NDJSON"""
+        response = StreamingHttpResponse(
+            ndjson.export_records(request.user, request.build_absolute_uri),
+            content_type=ndjson.MEDIA_TYPE
+        )
+        response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+        return response
+
+    @action(
+        methods=['POST'], detail=False, url_path='import',
+        url_name='import', parser_classes=[ndjson.NDJSONParser]
+    )
+    def import_records(self, request):
+        """Import tags, ingredients and posts from an NDJSON body"""
+        result = ndjson.import_records(request.user, request.data)
+        return Response(result)
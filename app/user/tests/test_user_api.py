@@ -5,6 +5,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.tests import factories
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -99,12 +101,13 @@ class PublicUserApiTests(TestCase):
 class PrivateUserApiTests(TestCase):
     """Test API requests that require authentication"""
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.create_user('test@noufal.com', username='fname')
+
     def setUp(self):
-        self.user = create_user(
-            email='test@noufal.com',
-            password='testpass',
-            username='fname',
-        )
+        # Requests update this instance, which every test shares
+        self.user.refresh_from_db()
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
@@ -118,6 +121,14 @@ class PrivateUserApiTests(TestCase):
             'email': self.user.email,
         })
 
+    def test_retrieve_profile_not_modified(self):
+        """Test an unchanged profile answers 304"""
+        res = self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_post_me_not_allowed(self):
         """Test that POST is not allowed on the me URL"""
         res = self.client.post(ME_URL, {})
@@ -1,7 +1,10 @@
+from django.contrib.auth import get_user_model
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 
+from core.authentication import CachedTokenAuthentication
+from core.conditional import ConditionalRetrieveMixin
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -21,11 +24,15 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ConditionalRetrieveMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+    def get_validator_queryset(self):
+        return get_user_model().objects.filter(pk=self.request.user.pk)
\ No newline at end of file